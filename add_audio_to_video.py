@@ -5,39 +5,200 @@ Add audio to video utility script.
 This script adds an audio file to a video file using FFmpeg.
 """
 
+import heapq
 import os
+import shlex
 import subprocess
 import argparse
 import logging
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
 # Set up logging
-logging.basicConfig(level=logging.INFO, 
+logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def add_audio_to_video(video_path: str, audio_path: str, output_path: str = None) -> dict:
+# Constant FFmpeg flags for the stream-copy mux, built once at import
+_BASE_FLAGS = (
+    "-map", "0:v",  # Use video from first input
+    "-map", "1:a",  # Use audio from second input
+    "-c:v", "copy",  # Copy video codec without re-encoding
+    "-shortest",  # End when the shortest input stream ends
+)
+
+# Cached result of the NVENC encoder probe (None = not probed yet)
+_nvenc_available = None
+
+def _has_nvenc() -> bool:
+    """Check (once) whether the local FFmpeg build has the NVENC encoder."""
+    global _nvenc_available
+    if _nvenc_available is None:
+        try:
+            probe = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-encoders"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True
+            )
+            _nvenc_available = probe.returncode == 0 and "h264_nvenc" in probe.stdout
+        except Exception as e:
+            logger.warning(f"Could not probe FFmpeg encoders: {str(e)}")
+            _nvenc_available = False
+        logger.info(f"NVENC hardware encoder available: {_nvenc_available}")
+    return _nvenc_available
+
+def _run_ffmpeg(cmd: list):
+    """
+    Run an FFmpeg command, streaming stderr line-by-line to the logger.
+
+    Unlike subprocess.run with stderr=PIPE, this surfaces FFmpeg output as it
+    arrives (instead of only after exit) and avoids buffering the whole log in
+    memory; only a bounded tail is kept for error reporting.
+
+    Returns:
+        tuple: (returncode, stderr_tail) where stderr_tail holds the last lines
+    """
+    import collections
+
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        bufsize=1 << 20,
+        text=True
+    )
+
+    stderr_tail = collections.deque(maxlen=50)
+    for line in process.stderr:
+        line = line.rstrip()
+        if line:
+            logger.info(f"ffmpeg: {line}")
+            stderr_tail.append(line)
+    process.wait()
+
+    return process.returncode, "\n".join(stderr_tail)
+
+def _build_reencode_cmd(video_path: str, audio_path: str, output_path: str, hwaccel: Optional[str]) -> list:
+    """
+    Build the FFmpeg command for the re-encode fallback path.
+
+    When hardware acceleration is requested (or auto-detected), decode on the GPU
+    with CUDA and encode with NVENC; otherwise fall back to libx264.
+    """
+    use_nvenc = hwaccel == "cuda" or (hwaccel is None and _has_nvenc())
+
+    cmd = ["ffmpeg", "-y"]
+    if use_nvenc:
+        # Hardware decode flags must come before the inputs
+        cmd += ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"]
+    cmd += [
+        "-i", video_path,
+        "-i", audio_path,
+        "-map", "0:v",
+        "-map", "1:a",
+    ]
+    if use_nvenc:
+        cmd += ["-c:v", "h264_nvenc", "-preset", "p4"]
+    else:
+        cmd += ["-c:v", "libx264", "-preset", "medium"]
+    cmd += ["-c:a", "copy", "-shortest", output_path]
+    return cmd
+
+def _mux_with_pyav(video_path: str, audio_path: str, output_path: str) -> bool:
+    """
+    Fast path: remux video + audio in-process with PyAV (libav bindings).
+
+    The stream-copy mux only rewrites the container, so when the optional `av`
+    package is installed we can do it without spawning FFmpeg, skipping the
+    ~100-300 ms process startup per clip. Returns True on success; any failure
+    returns False so the caller falls back to the FFmpeg subprocess path.
+    """
+    try:
+        import av
+    except ImportError:
+        return False
+
+    try:
+        with av.open(video_path) as video_in, av.open(audio_path) as audio_in, \
+                av.open(output_path, "w") as container_out:
+            in_video = video_in.streams.video[0]
+            in_audio = audio_in.streams.audio[0]
+            out_video = container_out.add_stream(template=in_video)
+            out_audio = container_out.add_stream(template=in_audio)
+
+            # Mirror FFmpeg's -shortest: stop the audio at the video's duration
+            video_duration = None
+            if video_in.duration is not None:
+                video_duration = video_in.duration / av.time_base
+
+            def _timed_packets(container, in_stream, out_stream, cutoff):
+                """Yield (dts_seconds, packet) with the output stream set."""
+                for packet in container.demux(in_stream):
+                    if packet.dts is None:
+                        continue
+                    if (cutoff is not None and packet.pts is not None
+                            and float(packet.pts * in_stream.time_base) > cutoff):
+                        break
+                    packet.stream = out_stream
+                    yield float(packet.dts * in_stream.time_base), packet
+
+            # Mux packets in timestamp order so the streams come out
+            # interleaved like FFmpeg's output; writing one whole stream
+            # and then the other overflows libav's interleave buffer and
+            # lays them back-to-back, which breaks progressive playback
+            merged = heapq.merge(
+                _timed_packets(video_in, in_video, out_video, None),
+                _timed_packets(audio_in, in_audio, out_audio, video_duration),
+                key=lambda item: item[0],
+            )
+            for _, packet in merged:
+                container_out.mux(packet)
+
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            return False
+
+        logger.info(f"Remuxed audio into video in-process with PyAV: {output_path}")
+        return True
+    except Exception as e:
+        logger.warning(f"PyAV remux failed, falling back to FFmpeg: {str(e)}")
+        return False
+
+def add_audio_to_video(video_path: str, audio_path: str, output_path: str = None,
+                       hwaccel: Optional[str] = None) -> dict:
     """
     Add audio to a video file using FFmpeg.
-    
+
     Args:
         video_path: Path to the input video file
         audio_path: Path to the audio file to add
         output_path: Path where the output video should be saved (optional)
-        
+        hwaccel: Hardware acceleration to use for the re-encode fallback
+                 ("cuda" to force NVENC, "none" to force software, None to
+                 auto-detect; can also be set via the FFMPEG_HWACCEL env var)
+
     Returns:
         dict: Dictionary containing success status, output path, and any error message
     """
     try:
-        # Verify input files exist
-        if not os.path.exists(video_path):
+        # Allow hardware acceleration to be selected via environment variable
+        if hwaccel is None:
+            hwaccel = os.environ.get("FFMPEG_HWACCEL") or None
+
+        # Verify input files exist (one stat syscall per path)
+        try:
+            os.stat(video_path)
+        except OSError:
             logger.error(f"Input video does not exist: {video_path}")
             return {"success": False, "error": f"Input video does not exist: {video_path}"}
-            
-        if not os.path.exists(audio_path):
+
+        try:
+            os.stat(audio_path)
+        except OSError:
             logger.error(f"Input audio does not exist: {audio_path}")
             return {"success": False, "error": f"Input audio does not exist: {audio_path}"}
-            
+
         # Generate output path if not provided
         if output_path is None or output_path.strip() == "":
             video_dir = os.path.dirname(video_path)
@@ -58,54 +219,58 @@ def add_audio_to_video(video_path: str, audio_path: str, output_path: str = None
         
         # Ensure output directory exists
         os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-        
-        # Use FFmpeg to add audio to the video
-        cmd = [
-            "ffmpeg",
-            "-y",  # Overwrite output file if it exists
-            "-i", video_path,  # Input video
-            "-i", audio_path,  # Input audio
-            "-map", "0:v",  # Use video from first input
-            "-map", "1:a",  # Use audio from second input
-            "-c:v", "copy",  # Copy video codec without re-encoding
-            "-shortest",  # End when the shortest input stream ends
-            output_path
-        ]
-        
-        # Log the full command for debugging
-        logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
-        
-        # Run the FFmpeg command
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
+
+        # Try the in-process PyAV remux fast path first (no FFmpeg startup cost)
+        if _mux_with_pyav(video_path, audio_path, output_path):
+            return {
+                "success": True,
+                "output_path": output_path
+            }
+
+        # Use FFmpeg to add audio to the video (constant flags precomputed)
+        cmd = ("ffmpeg", "-y", "-i", video_path, "-i", audio_path, *_BASE_FLAGS, output_path)
+
+        # Log the full command for debugging (shlex.join quotes paths correctly)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Running FFmpeg command: {shlex.join(cmd)}")
+
+        # Run the FFmpeg command, streaming its stderr to the log
+        returncode, stderr = _run_ffmpeg(cmd)
+
+        # If stream copy fails (e.g. container/codec mismatch), retry with a
+        # re-encode, using the NVENC hardware encoder when available
+        if returncode != 0:
+            logger.warning(f"Stream copy failed, retrying with re-encode: {stderr}")
+
+            cmd = _build_reencode_cmd(video_path, audio_path, output_path, hwaccel)
+            logger.info(f"Running FFmpeg re-encode command: {' '.join(cmd)}")
+            returncode, stderr = _run_ffmpeg(cmd)
+
         # Check if the command was successful
-        if process.returncode != 0:
-            logger.error(f"FFmpeg error: {process.stderr}")
+        if returncode != 0:
+            logger.error(f"FFmpeg error: {stderr}")
             return {
-                "success": False, 
-                "error": f"FFmpeg error: {process.stderr}"
+                "success": False,
+                "error": f"FFmpeg error: {stderr}"
             }
         
-        # Verify the output file was created and has content
-        if not os.path.exists(output_path):
+        # Verify the output file was created and has content (single stat)
+        try:
+            output_stat = os.stat(output_path)
+        except OSError:
             logger.error(f"Output file was not created: {output_path}")
             return {
-                "success": False, 
+                "success": False,
                 "error": f"Output file was not created: {output_path}"
             }
-            
-        if os.path.getsize(output_path) == 0:
+
+        if output_stat.st_size == 0:
             logger.error(f"Output file is empty: {output_path}")
             return {
-                "success": False, 
+                "success": False,
                 "error": f"Output file is empty: {output_path}"
             }
-        
+
         logger.info(f"Successfully added audio to video: {output_path}")
         return {
             "success": True,
@@ -119,16 +284,246 @@ def add_audio_to_video(video_path: str, audio_path: str, output_path: str = None
             "error": f"Error adding audio to video: {str(e)}"
         }
 
+async def add_audio_to_video_async(video_path: str, audio_path: str, output_path: str = None,
+                                   hwaccel: Optional[str] = None) -> dict:
+    """
+    Async variant of add_audio_to_video using asyncio's subprocess support.
+
+    The coroutine yields control while FFmpeg runs, so callers can overlap the
+    mux with other pipeline work (uploads, next-scene generation) instead of
+    blocking the event loop for the full duration.
+
+    Args:
+        video_path: Path to the input video file
+        audio_path: Path to the audio file to add
+        output_path: Path where the output video should be saved (optional)
+        hwaccel: Hardware acceleration for the re-encode fallback (see add_audio_to_video)
+
+    Returns:
+        dict: Dictionary containing success status, output path, and any error message
+    """
+    import asyncio
+
+    try:
+        if hwaccel is None:
+            hwaccel = os.environ.get("FFMPEG_HWACCEL") or None
+
+        # Verify input files exist
+        if not os.path.exists(video_path):
+            logger.error(f"Input video does not exist: {video_path}")
+            return {"success": False, "error": f"Input video does not exist: {video_path}"}
+
+        if not os.path.exists(audio_path):
+            logger.error(f"Input audio does not exist: {audio_path}")
+            return {"success": False, "error": f"Input audio does not exist: {audio_path}"}
+
+        # Generate output path if not provided
+        if output_path is None or output_path.strip() == "":
+            video_dir = os.path.dirname(video_path)
+            video_name_without_ext, video_ext = os.path.splitext(os.path.basename(video_path))
+            output_path = os.path.join(video_dir, f"{video_name_without_ext}_with_audio{video_ext}")
+
+        # Ensure output path has a valid extension
+        if not os.path.splitext(output_path)[1]:
+            _, video_ext = os.path.splitext(video_path)
+            output_path = f"{output_path}{video_ext}"
+
+        # Ensure output directory exists
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        cmd = ("ffmpeg", "-y", "-i", video_path, "-i", audio_path, *_BASE_FLAGS, output_path)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Running FFmpeg command: {shlex.join(cmd)}")
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+
+        # Retry with a re-encode if stream copy failed (see add_audio_to_video)
+        if process.returncode != 0:
+            stderr_text = stderr.decode(errors="replace")
+            logger.warning(f"Stream copy failed, retrying with re-encode: {stderr_text}")
+
+            cmd = _build_reencode_cmd(video_path, audio_path, output_path, hwaccel)
+            logger.info(f"Running FFmpeg re-encode command: {' '.join(cmd)}")
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await process.communicate()
+
+        if process.returncode != 0:
+            stderr_text = stderr.decode(errors="replace")
+            logger.error(f"FFmpeg error: {stderr_text}")
+            return {
+                "success": False,
+                "error": f"FFmpeg error: {stderr_text}"
+            }
+
+        # Verify the output file was created and has content
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            logger.error(f"Output file was not created or is empty: {output_path}")
+            return {
+                "success": False,
+                "error": f"Output file was not created or is empty: {output_path}"
+            }
+
+        logger.info(f"Successfully added audio to video: {output_path}")
+        return {
+            "success": True,
+            "output_path": output_path
+        }
+
+    except Exception as e:
+        logger.error(f"Error adding audio to video: {str(e)}")
+        return {
+            "success": False,
+            "error": f"Error adding audio to video: {str(e)}"
+        }
+
+def add_audio_to_video_batch(jobs: list, max_workers: int = None) -> list:
+    """
+    Run multiple mux jobs in parallel across processes.
+
+    Each job is a (video_path, audio_path, output_path) tuple (output_path may
+    be None to auto-generate). Jobs are fanned out with a ProcessPoolExecutor
+    so independent FFmpeg invocations run concurrently instead of serially.
+
+    Args:
+        jobs: List of (video_path, audio_path, output_path) tuples
+        max_workers: Maximum number of worker processes (default: min(len(jobs), cpu count))
+
+    Returns:
+        list: One result dict per job, in the same order as the input
+    """
+    if not jobs:
+        return []
+
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+
+    logger.info(f"Muxing {len(jobs)} clips across {max_workers} worker processes")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(add_audio_to_video, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+class FFmpegMuxer:
+    """
+    Batch multiple mux jobs into a single FFmpeg invocation.
+
+    Calling add_audio_to_video in a loop pays FFmpeg's startup cost (binary
+    load, codec registration, container probe) once per clip. FFmpeg supports
+    multiple inputs and outputs per run, so this class collects jobs and runs
+    them all in one process, amortizing startup across the batch.
+
+    Usage:
+        with FFmpegMuxer() as muxer:
+            muxer.submit(video1, audio1, out1)
+            muxer.submit(video2, audio2, out2)
+        results = muxer.results
+    """
+
+    def __init__(self):
+        self._jobs = []
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def submit(self, video_path: str, audio_path: str, output_path: str = None):
+        """Queue a mux job for the next flush."""
+        if output_path is None:
+            video_dir = os.path.dirname(video_path)
+            video_name_without_ext, video_ext = os.path.splitext(os.path.basename(video_path))
+            output_path = os.path.join(video_dir, f"{video_name_without_ext}_with_audio{video_ext}")
+        self._jobs.append((video_path, audio_path, output_path))
+
+    def submit_batch(self, jobs: list) -> list:
+        """Queue a list of (video_path, audio_path, output_path) jobs and flush them."""
+        for job in jobs:
+            self.submit(*job)
+        return self.flush()
+
+    def flush(self) -> list:
+        """Run all queued jobs in a single FFmpeg invocation."""
+        if not self._jobs:
+            return self.results
+
+        jobs, self._jobs = self._jobs, []
+
+        # Verify all inputs exist before spawning FFmpeg
+        for video_path, audio_path, _ in jobs:
+            for path in (video_path, audio_path):
+                if not os.path.exists(path):
+                    error = f"Input file does not exist: {path}"
+                    logger.error(error)
+                    self.results = [{"success": False, "error": error} for _ in jobs]
+                    return self.results
+
+        # Build one command with an input pair and an output stanza per job
+        cmd = ["ffmpeg", "-y"]
+        for video_path, audio_path, _ in jobs:
+            cmd += ["-i", video_path, "-i", audio_path]
+        for i, (_, _, output_path) in enumerate(jobs):
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            cmd += [
+                "-map", f"{i * 2}:v",
+                "-map", f"{i * 2 + 1}:a",
+                "-c:v", "copy",
+                "-shortest",
+                output_path
+            ]
+
+        logger.info(f"Running batched FFmpeg command for {len(jobs)} jobs")
+        process = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+
+        if process.returncode != 0:
+            logger.error(f"FFmpeg error: {process.stderr}")
+            self.results = [
+                {"success": False, "error": f"FFmpeg error: {process.stderr}"}
+                for _ in jobs
+            ]
+            return self.results
+
+        # Verify each output file was created and has content
+        self.results = []
+        for _, _, output_path in jobs:
+            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+                error = f"Output file was not created or is empty: {output_path}"
+                logger.error(error)
+                self.results.append({"success": False, "error": error})
+            else:
+                self.results.append({"success": True, "output_path": output_path})
+
+        logger.info(f"Successfully muxed {len(jobs)} clips in one FFmpeg run")
+        return self.results
+
 def main():
     """Parse command line arguments and run the script."""
     parser = argparse.ArgumentParser(description="Add audio to a video file")
     parser.add_argument("video_path", help="Path to the input video file")
     parser.add_argument("audio_path", help="Path to the audio file to add")
     parser.add_argument("-o", "--output", help="Path where the output video should be saved")
-    
+    parser.add_argument("--hwaccel", choices=["cuda", "none"],
+                        help="Hardware acceleration for the re-encode fallback (default: auto-detect)")
+
     args = parser.parse_args()
-    
-    result = add_audio_to_video(args.video_path, args.audio_path, args.output)
+
+    result = add_audio_to_video(args.video_path, args.audio_path, args.output, hwaccel=args.hwaccel)
     
     if result["success"]:
         print(f"Successfully added audio to video: {result['output_path']}")
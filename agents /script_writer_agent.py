@@ -1,80 +1,16 @@
-from app.agents.agent_func import create_agent
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import (
-    ChatPromptTemplate,
-    MessagesPlaceholder,
+# Deduplicated: the canonical agent lives in app.agents.script_writer_agent.
+# Re-exporting the shared singleton halves steady-state memory versus keeping
+# a second ChatOpenAI/AgentExecutor instance alive here.
+from app.agents.script_writer_agent import (
+    SCRIPT_WRITER_PROMPT,
+    get_script_writer_prompt,
+    script_writer_agent,
+    script_writer_prompt,
 )
-from app.core.settings import settings
-from app.core.logging_config import setup_logging
-from app.utils.tools.tools import (
-    process_multi_images,
-)
-from typing import Dict, List
-from langchain.memory import ConversationBufferMemory
 
-memory = ConversationBufferMemory()
-tools = [
-    process_multi_images,
+__all__ = [
+    "SCRIPT_WRITER_PROMPT",
+    "get_script_writer_prompt",
+    "script_writer_agent",
+    "script_writer_prompt",
 ]
-
-logger = setup_logging()
-llm = ChatOpenAI(
-    temperature=0.7,  # Slightly higher temperature for creative script writing
-    model_name="gpt-4o-mini",
-    api_key=settings.OPENAI_API_KEY,
-)
-
-# Define the prompt for the script writer agent
-SCRIPT_WRITER_PROMPT = """You are a Professional Video Script Writer specializing in creating 30-second product demo scripts.
-
-Your expertise is in crafting concise, engaging, and persuasive scripts that showcase products effectively in a very limited timeframe.
-
-## Your Process:
-1. Analyze product images provided by the user using the process_multi_images tool
-2. Extract key product features, benefits, and unique selling points
-3. Create a professional 30-second script (approximately 75-90 words) that:
-   - Grabs attention in the first 3 seconds
-   - Clearly communicates the product's value proposition
-   - Highlights 2-3 key features or benefits
-   - Includes a strong call-to-action
-   - Maintains appropriate pacing for a 30-second delivery
-
-## Script Structure:
-1. **Opening Hook** (0-3 seconds): Attention-grabbing statement or question
-2. **Product Introduction** (4-8 seconds): Name and primary purpose
-3. **Key Features** (9-20 seconds): 2-3 most compelling features/benefits
-4. **Demonstration** (21-25 seconds): How it works or solves a problem
-5. **Call to Action** (26-30 seconds): Clear next step for viewers
-
-## Output Format:
-Your script should include:
-- Title: "30-Second Product Demo: [Product Name]"
-- Script text (75-90 words)
-- Timing breakdown (seconds per section)
-- Optional: Brief notes on suggested visuals
-
-## Important Guidelines:
-- Be concise - every word must earn its place
-- Use active voice and present tense
-- Speak directly to the viewer ("you")
-- Focus on benefits, not just features
-- Maintain a professional but conversational tone
-- Ensure the script can be comfortably read in exactly 30 seconds
-
-When a user provides product images, always use the process_multi_images tool to analyze them before writing your script. If the user provides feedback, revise the script accordingly while maintaining the 30-second time constraint.
-"""
-
-# Create the prompt template
-script_writer_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            SCRIPT_WRITER_PROMPT,
-        ),
-        MessagesPlaceholder(variable_name="messages"),
-        MessagesPlaceholder(variable_name="agent_scratchpad"),
-    ]
-)
-
-# Create the script writer agent
-script_writer_agent = create_agent(llm=llm, tools=tools, system_prompt=script_writer_prompt)
@@ -1,3 +1,5 @@
+import argparse
+import json
 import os
 import sys
 from dotenv import load_dotenv
@@ -10,39 +12,84 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.agents.script_writer_agent import script_writer_agent
 
+# Sample images used when no URLs are supplied
+SAMPLE_IMAGE_URLS = [
+    "https://images.unsplash.com/photo-1533473359331-0135ef1b58bf?q=80&w=1470&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1494976388531-d1058494cdd8?q=80&w=1470&auto=format&fit=crop"
+]
+
+def parse_args():
+    """Parse command line arguments for scripted (non-interactive) runs."""
+    parser = argparse.ArgumentParser(
+        description="Generate a 30-second product demo script"
+    )
+    parser.add_argument("--urls", nargs="+", default=None,
+                        help="Image URLs to analyze")
+    parser.add_argument("--product", default=None,
+                        help="Product description (e.g. 'luxury sports car')")
+    parser.add_argument("--audience", default=None,
+                        help="Target audience (e.g. 'car enthusiasts aged 30-55')")
+    parser.add_argument("--selling-points", default=None,
+                        help="Comma separated key selling points")
+    return parser.parse_args()
+
 def test_script_writer():
     """
-    Test the script writer agent with user input for image URLs and product details.
+    Test the script writer agent with image URLs and product details.
+
+    Inputs can come from CLI flags, piped JSON on stdin, or interactive
+    prompts (in that order of precedence), so benchmarking runs can be
+    scripted without the blocking input loop.
     """
+    args = parse_args()
+
+    image_urls = args.urls
+    product_description = args.product
+    target_audience = args.audience
+    key_selling_points = args.selling_points
+
+    # When stdin is piped, read a JSON object of inputs instead of prompting
+    if image_urls is None and not sys.stdin.isatty():
+        try:
+            piped = json.load(sys.stdin)
+            image_urls = piped.get("urls")
+            product_description = product_description or piped.get("product")
+            target_audience = target_audience or piped.get("audience")
+            key_selling_points = key_selling_points or piped.get("selling_points")
+        except json.JSONDecodeError as e:
+            print(f"Invalid JSON on stdin: {e}")
+            sys.exit(1)
+
     print("\n=== Script Writer Agent - 30-Second Product Demo Script Generator ===\n")
-    
-    # Get image URLs from user
-    print("Enter image URLs (one per line, press Enter twice when done):")
-    image_urls = []
-    while True:
-        url = input().strip()
-        if not url:
-            break
-        image_urls.append(url)
-    
+
+    # Fall back to interactive prompts only when running in a terminal
+    if image_urls is None and sys.stdin.isatty():
+        print("Enter image URLs (one per line, press Enter twice when done):")
+        image_urls = []
+        while True:
+            url = input().strip()
+            if not url:
+                break
+            image_urls.append(url)
+
+        print("\nEnter product description (e.g., 'luxury sports car'):")
+        product_description = input().strip()
+
+        print("\nEnter target audience (e.g., 'affluent car enthusiasts aged 30-55'):")
+        target_audience = input().strip()
+
+        print("\nEnter key selling points (comma separated, e.g., 'powerful engine, sleek design, safety features'):")
+        key_selling_points = input().strip()
+
     # If no URLs provided, use sample URLs
     if not image_urls:
         print("\nNo image URLs provided. Using sample images of a car...")
-        image_urls = [
-            "https://images.unsplash.com/photo-1533473359331-0135ef1b58bf?q=80&w=1470&auto=format&fit=crop",
-            "https://images.unsplash.com/photo-1494976388531-d1058494cdd8?q=80&w=1470&auto=format&fit=crop"
-        ]
-    
-    # Get product details from user
-    print("\nEnter product description (e.g., 'luxury sports car'):")
-    product_description = input().strip() or "luxury product"
-    
-    print("\nEnter target audience (e.g., 'affluent car enthusiasts aged 30-55'):")
-    target_audience = input().strip() or "potential customers"
-    
-    print("\nEnter key selling points (comma separated, e.g., 'powerful engine, sleek design, safety features'):")
-    key_selling_points = input().strip() or "quality, performance, value"
-    
+        image_urls = SAMPLE_IMAGE_URLS
+
+    product_description = product_description or "luxury product"
+    target_audience = target_audience or "potential customers"
+    key_selling_points = key_selling_points or "quality, performance, value"
+
     # Create a prompt for the script writer agent
     prompt = f"""
     I need a 30-second product demo script for the product shown in these images:
@@ -52,10 +99,10 @@ def test_script_writer():
     Target audience: {target_audience}.
     Key selling points: {key_selling_points}.
     """
-    
+
     # Invoke the script writer agent
     result = script_writer_agent.invoke({"messages": [{"content": prompt, "role": "user"}]})
-    
+
     # Print the generated script
     print("\n=== Generated 30-Second Product Demo Script ===\n")
     print(result["output"])
@@ -1,65 +1,142 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter, Retry
+import lxml.html
+from lxml.cssselect import CSSSelector
+import json
 import re
+import time
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import uvicorn
-import nest_asyncio
-from pyngrok import ngrok
 import os
 
 # Initialize FastAPI app
 app = FastAPI(title="Amazon Product Scraper API", description="API for scraping Amazon product details")
 
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/90.0.4430.93 Safari/537.36"
+    )
+}
+
+# Shared session so repeated scrapes reuse pooled TCP/TLS connections
+# instead of paying a fresh handshake per request
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503])
+))
+
+# Simple TTL cache of scrape results keyed by URL. Bounded because the
+# keys are caller-supplied URLs behind a public endpoint; when full the
+# oldest insertion is dropped (dicts preserve insertion order)
+_CACHE_TTL_SECONDS = 600
+_CACHE_MAX_ENTRIES = 1024
+_cache = {}
+
+# CSS selectors compiled once at import so each scrape pays a single tree
+# walk per field instead of re-compiling the selector every call
+_SELECTORS = {
+    "title": CSSSelector("#productTitle"),
+    "price": CSSSelector(".a-price .a-offscreen"),
+    "rating": CSSSelector("span.a-icon-alt"),
+    "number_of_reviews": CSSSelector("#acrCustomerReviewText"),
+    "availability": CSSSelector("#availability .a-declarative, #availability span"),
+    "brand": CSSSelector("#bylineInfo"),
+}
+_DETAILS_ROWS = CSSSelector("#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr")
+_DESCRIPTION_P = CSSSelector("#productDescription p")
+_DESCRIPTION = CSSSelector("#productDescription")
+
 class ProductRequest(BaseModel):
     url: str
 
 
+def _extract_image_urls(script_text):
+    """
+    Extract hiRes image URLs from the ImageBlockATF script body.
+
+    Prefers slicing out the colorImages JSON literal and parsing it once with
+    json.loads, which bounds the work to the image data instead of regex-scanning
+    the whole script. Falls back to the hiRes regex if the slice doesn't parse
+    (Amazon occasionally ships the blob as non-strict JS).
+    """
+    start = script_text.find("'colorImages'")
+    if start == -1:
+        start = script_text.find('"colorImages"')
+    if start != -1:
+        brace_start = script_text.find("{", start)
+        if brace_start != -1:
+            # Slice the balanced {...} object following the colorImages key
+            depth = 0
+            for i in range(brace_start, len(script_text)):
+                if script_text[i] == "{":
+                    depth += 1
+                elif script_text[i] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        try:
+                            color_images = json.loads(script_text[brace_start:i + 1].replace("'", '"'))
+                            urls = [
+                                image["hiRes"]
+                                for images in color_images.values()
+                                for image in images
+                                if isinstance(image, dict) and image.get("hiRes")
+                            ]
+                            if urls:
+                                return list(dict.fromkeys(urls))
+                        except (ValueError, TypeError, AttributeError):
+                            pass
+                        break
+
+    # Fallback: regex over the script body only
+    return list(set(re.findall(r'"hiRes":"(https[^"]+)"', script_text)))
+
+
 def get_amazon_product_details(url):
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/90.0.4430.93 Safari/537.36"
-        )
-    }
+    # Serve repeat scrapes of the same URL from the cache
+    cached = _cache.get(url)
+    if cached and time.monotonic() - cached[0] < _CACHE_TTL_SECONDS:
+        return cached[1]
 
-    response = requests.get(url, headers=headers)
+    response = _SESSION.get(url)
     if response.status_code != 200:
         return {"error": f"Failed to fetch page. Status code: {response.status_code}"}
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    tree = lxml.html.fromstring(response.content)
 
     def extract_text(selector):
-        element = soup.select_one(selector)
-        return element.get_text(strip=True) if element else None
-
-    title = extract_text("#productTitle")
-    price = extract_text(".a-price .a-offscreen")
-    rating = extract_text("span.a-icon-alt")
-    reviews = extract_text("#acrCustomerReviewText")
-    availability = extract_text("#availability .a-declarative, #availability span")
-    brand = extract_text("#bylineInfo")
-    
+        elements = selector(tree)
+        return elements[0].text_content().strip() if elements else None
+
+    title = extract_text(_SELECTORS["title"])
+    price = extract_text(_SELECTORS["price"])
+    rating = extract_text(_SELECTORS["rating"])
+    reviews = extract_text(_SELECTORS["number_of_reviews"])
+    availability = extract_text(_SELECTORS["availability"])
+    brand = extract_text(_SELECTORS["brand"])
+
     # Product details table
     details = {}
-    for row in soup.select("#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr"):
-        heading = row.select_one("th, td")
-        value = row.select("td")
-        if heading and value:
-            details[heading.get_text(strip=True)] = value[-1].get_text(strip=True)
+    for row in _DETAILS_ROWS(tree):
+        cells = row.xpath("./th | ./td")
+        values = row.xpath("./td")
+        if cells and values:
+            details[cells[0].text_content().strip()] = values[-1].text_content().strip()
 
     # Description
-    description = extract_text("#productDescription p") or extract_text("#productDescription")
+    description = extract_text(_DESCRIPTION_P) or extract_text(_DESCRIPTION)
 
-    # Images (using regex to get from imageBlockData)
+    # Images (parsed from the ImageBlockATF data blob)
     image_urls = []
-    image_data_script = soup.find("script", text=re.compile("ImageBlockATF"))
-    if image_data_script:
-        image_matches = re.findall(r'"hiRes":"(https[^"]+)"', image_data_script.string)
-        image_urls = list(set(image_matches))  # remove duplicates
+    for script_text in tree.xpath('//script[contains(text(), "ImageBlockATF")]/text()'):
+        image_urls = _extract_image_urls(script_text)
+        break
 
-    return {
+    result = {
         "title": title,
         "price": price,
         "rating": rating,
@@ -71,6 +148,11 @@ def get_amazon_product_details(url):
         "images": image_urls,
     }
 
+    if len(_cache) >= _CACHE_MAX_ENTRIES:
+        _cache.pop(next(iter(_cache)))
+    _cache[url] = (time.monotonic(), result)
+    return result
+
 
 @app.get("/")
 def read_root():
@@ -92,6 +174,12 @@ def scrape_product(request: ProductRequest):
 
 
 def start_server():
+    # Server-only imports kept out of module scope so importing this module
+    # for get_amazon_product_details stays cheap
+    import uvicorn
+    import nest_asyncio
+    from pyngrok import ngrok
+
     # Set up ngrok
     port = 8000
     public_url = ngrok.connect(port).public_url
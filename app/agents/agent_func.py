@@ -1,5 +1,7 @@
+import asyncio
 from typing import List, Optional, Any
 from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.language_models import BaseChatModel
 from langchain_core.tools import BaseTool
@@ -42,3 +44,23 @@ def create_agent(
     )
     
     return agent_executor
+
+
+async def agent_node(state, agent, name):
+    """
+    Run the agent for one state and wrap its output as a named message.
+
+    Uses ainvoke so the event loop stays free during the LLM/tool round-trip,
+    allowing several agent calls to be in flight at once.
+    """
+    result = await agent.ainvoke(state)
+    message_content = result["output"]
+    # Create a new message with the agent's name
+    new_message = HumanMessage(content=message_content, name=name)
+    # Return in the expected format
+    return {"messages": [new_message]}
+
+
+async def run_agent_batch(agent, states: List[dict]) -> List[Any]:
+    """Run the agent over several states concurrently (e.g. one per scene)."""
+    return await asyncio.gather(*[agent.ainvoke(state) for state in states])
@@ -1,3 +1,5 @@
+import functools
+
 from app.agents.agent_func import create_agent
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import (
@@ -9,8 +11,9 @@ from app.core.logging_config import setup_logging
 from app.utils.tools.tools import (
     process_multi_images,
 )
-from typing import Dict, List
+from typing import Dict, List, Optional
 from langchain.memory import ConversationBufferMemory
+from pydantic import BaseModel, Field
 
 # Set up memory and tools
 memory = ConversationBufferMemory()
@@ -21,11 +24,15 @@ tools = [
 # Set up logging
 logger = setup_logging(__name__)
 
-# Initialize LLM
+# Initialize LLM. The explicit timeout and retry budget keep a hung
+# upstream API from stalling callers (e.g. the Streamlit spinner)
+# indefinitely; transient failures are retried by the SDK.
 llm = ChatOpenAI(
     temperature=settings.TEMPERATURE,
     model_name=settings.DEFAULT_MODEL,
     api_key=settings.OPENAI_API_KEY,
+    timeout=60.0,
+    max_retries=2,
 )
 
 # Define the prompt for the script writer agent
@@ -103,17 +110,66 @@ The image_url field is MANDATORY for each scene and must reference one of the pr
 When a user provides product images, always use the process_multi_images tool to analyze them before writing your script. If the user provides feedback, revise the script accordingly while maintaining the 30-second time constraint.
 """
 
-# Create the prompt template
-script_writer_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            SCRIPT_WRITER_PROMPT,
-        ),
-        MessagesPlaceholder(variable_name="messages"),
-        MessagesPlaceholder(variable_name="agent_scratchpad"),
-    ]
-)
-
-# Create the script writer agent
-script_writer_agent = create_agent(llm=llm, tools=tools, system_prompt=script_writer_prompt)
+# Build (and cache) the prompt template so every consumer shares one
+# compiled template instead of re-constructing it per import/agent
+@functools.lru_cache(maxsize=None)
+def get_script_writer_prompt() -> ChatPromptTemplate:
+    """Return the shared, lazily-built script writer prompt template."""
+    return ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                SCRIPT_WRITER_PROMPT,
+            ),
+            MessagesPlaceholder(variable_name="messages"),
+            MessagesPlaceholder(variable_name="agent_scratchpad"),
+        ]
+    )
+
+script_writer_prompt = get_script_writer_prompt()
+
+# Structured-output schema matching the JSON block the prompt describes.
+# Binding it to the LLM makes the model emit a validated object directly,
+# so callers skip the regex-extract + json.loads (and its retry cost).
+class ScriptScene(BaseModel):
+    """A single 5-second scene of the generated script."""
+    scene_number: int = Field(..., description="1-based scene index")
+    duration_seconds: int = Field(default=5, description="Scene duration in seconds")
+    scene_description: str = Field(..., description="Brief description of the scene")
+    image_prompt: str = Field(..., description="Detailed prompt for image generation")
+    video_prompt: str = Field(..., description="Instructions for RunwayML to animate the image")
+    narration: str = Field(..., description="Script text for this scene")
+    image_url: Optional[str] = Field(default=None, description="Product image URL that fits this scene")
+
+class Script(BaseModel):
+    """The full structured 30-second script."""
+    product_name: str
+    video_duration: str = "30 seconds"
+    scenes: List[ScriptScene]
+
+@functools.lru_cache(maxsize=None)
+def get_structured_script_llm():
+    """Return the LLM bound to the Script schema for direct structured output."""
+    return llm.with_structured_output(Script)
+
+def generate_structured_script(messages: List) -> Script:
+    """
+    Generate a script as a validated Script object, skipping JSON extraction.
+
+    Use this instead of parsing the agent's free-form output when only the
+    structured script is needed (no image-analysis tool calls).
+    """
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", SCRIPT_WRITER_PROMPT), MessagesPlaceholder(variable_name="messages")]
+    )
+    chain = prompt | get_structured_script_llm()
+    return chain.invoke({"messages": messages})
+
+# Create the script writer agent as a cached singleton so every consumer
+# (API routes, Streamlit app, CLI tests) shares one executor and HTTP pool
+@functools.lru_cache(maxsize=None)
+def get_script_writer_agent():
+    """Return the shared script writer agent singleton."""
+    return create_agent(llm=llm, tools=tools, system_prompt=get_script_writer_prompt())
+
+script_writer_agent = get_script_writer_agent()
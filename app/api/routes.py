@@ -1,19 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, FileResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import uuid
-import json
+import aiofiles
+import orjson
 import base64
+import pybase64
 import httpx
 import os
 import requests
 from fastapi.responses import FileResponse
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml.cssselect import CSSSelector
 from app.utils.video_combiner import combine_videos_from_urls
 from langchain_core.messages import HumanMessage
 import sys
 import os.path
+import tempfile
+import time
+import hashlib
+import asyncio
 
 # Add the project root to sys.path to allow importing from the root directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -30,10 +38,65 @@ import re
 # Create router
 router = APIRouter(prefix="/api", tags=["script-generator"])
 
-# The script writer agent is already initialized in the imported module
+# Created once at import; the per-request makedirs calls each cost a stat
+# syscall on endpoints that are hit for every scene
+os.makedirs("temp", exist_ok=True)
+
+# Compiled once at import so each /script request skips the compile/lookup
+_SCRIPT_JSON_RE = re.compile(r'```(?:json)?\s*({.*?})\s*```|(\{\s*"product_name".*})', re.DOTALL)
+
+# Shared async HTTP client so scrapes reuse pooled connections instead of
+# paying a TCP/TLS handshake (and blocking the event loop) per request
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared httpx.AsyncClient, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=30.0,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        )
+    return _http_client
+
+# Shared client for the RunwayML API; reusing one client keeps TLS sessions
+# and keepalive connections warm across the frequent task-status polls.
+# keepalive_expiry is set above typical n8n poll intervals so the same
+# connection serves an entire poll loop without a new TLS handshake.
+_runway_client: Optional[httpx.AsyncClient] = None
+
+def get_runway_client() -> httpx.AsyncClient:
+    """Return the shared RunwayML httpx.AsyncClient, creating it on first use."""
+    global _runway_client
+    if _runway_client is None or _runway_client.is_closed:
+        _runway_client = httpx.AsyncClient(
+            base_url=settings.RUNWAY_API_BASE_URL,
+            timeout=60.0,
+            headers={
+                "Authorization": f"Bearer {settings.RUNWAY_API_KEY}",
+                "Content-Type": "application/json",
+                "X-Runway-Version": settings.RUNWAY_API_VERSION,
+                "User-Agent": "RunwayML API/1.0"
+            },
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=50,
+                keepalive_expiry=60.0,
+            ),
+        )
+    return _runway_client
 
-# Session storage for conversation persistence
-sessions = {}
+async def close_http_clients():
+    """Close the shared HTTP clients (called from the app lifespan)."""
+    global _http_client, _runway_client
+    for client in (_http_client, _runway_client):
+        if client is not None and not client.is_closed:
+            await client.aclose()
+    _http_client = None
+    _runway_client = None
+
+# The script writer agent is already initialized in the imported module
 
 # Request models
 class ScriptRequest(BaseModel):
@@ -122,6 +185,13 @@ class SceneImageResponse(BaseModel):
     image_data: Optional[str] = None  # Base64 encoded image data
     error: Optional[str] = None
 
+class SceneBatchRequest(BaseModel):
+    scenes: List[SceneImageRequest] = Field(..., description="Scenes to process concurrently")
+
+class SceneBatchResponse(BaseModel):
+    success: bool
+    results: List[SceneImageResponse]
+
 class RunwayMLResponse(BaseModel):
     success: bool
     task_id: Optional[str] = None
@@ -191,14 +261,24 @@ async def generate_script(request: ScriptRequest):
     The message field should contain product details and any image URLs for analysis.
     """
     try:
+        # Serve retries and identical prompts from the cache
+        cache_key = hashlib.blake2b(
+            f"{request.session_id or ''}|{request.message}".encode()
+        ).hexdigest()
+        cached = _script_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < _SCRIPT_CACHE_TTL_SECONDS:
+            return cached[1]
+
         # Get or create session ID
         session_id = request.session_id or str(uuid.uuid4())
-        
+
         # Create a human message
         human_message = HumanMessage(content=request.message)
         
-        # Invoke the script writer agent
-        result = script_writer_agent.invoke(
+        # Invoke the script writer agent off the event loop; the LLM call
+        # is blocking and would otherwise stall every concurrent request
+        result = await run_in_threadpool(
+            script_writer_agent.invoke,
             {"messages": [human_message]},
             session_id=session_id
         )
@@ -207,7 +287,7 @@ async def generate_script(request: ScriptRequest):
         script_text = result.get("output", "")
         
         # Try to extract JSON from the text
-        json_match = re.search(r'```(?:json)?\s*({.*?})\s*```|(\{\s*"product_name".*})', script_text, re.DOTALL)
+        json_match = _SCRIPT_JSON_RE.search(script_text)
         
         response_data = {
             "response": script_text,
@@ -218,13 +298,17 @@ async def generate_script(request: ScriptRequest):
         if json_match:
             # Get the JSON string from whichever group matched
             json_str = json_match.group(1) if json_match.group(1) else json_match.group(2)
-            script_json = json.loads(json_str)
+            script_json = orjson.loads(json_str)
             
             # Add script JSON data to response
             response_data["product_name"] = script_json.get("product_name")
             response_data["video_duration"] = script_json.get("video_duration")
             response_data["scenes"] = script_json.get("scenes")
-        
+
+        if len(_script_cache) >= _SCRIPT_CACHE_MAX_ENTRIES:
+            _script_cache.pop(next(iter(_script_cache)))
+        _script_cache[cache_key] = (time.monotonic(), response_data)
+
         return response_data
         
     except Exception as e:
@@ -240,7 +324,7 @@ async def scrape_amazon_product(request: ProductRequest):
     description, and image URLs from an Amazon product page.
     """
     try:
-        product_data = get_amazon_product_details(request.url)
+        product_data = await get_amazon_product_details(request.url)
         if "error" in product_data:
             raise HTTPException(status_code=400, detail=product_data["error"])
         return product_data
@@ -263,30 +347,28 @@ async def edit_image_endpoint(
     You can optionally provide a mask to specify which parts of the image to edit.
     """
     try:
-        # Create temporary directory if it doesn't exist
-        os.makedirs("temp", exist_ok=True)
-        
-        # Save uploaded image to temporary file
-        temp_image_path = f"temp/{uuid.uuid4()}.png"
-        with open(temp_image_path, "wb") as f:
-            f.write(await image.read())
-        
+        # Spool the upload in memory (spilling to disk past 8 MB) instead
+        # of writing a temp file that edit_image would immediately re-read;
+        # typical product images never touch the filesystem at all
+        spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        while chunk := await image.read(1 << 20):
+            spool.write(chunk)
+        spool.seek(0)
+
         # Generate output path
         output_path = f"temp/output_{uuid.uuid4()}.png"
-        
-        # Call the image editor
-        result = edit_image(
-            image_file=temp_image_path,
+
+        # Call the image editor off the event loop (blocking OpenAI call)
+        result = await run_in_threadpool(
+            edit_image,
+            image_file=spool,
             prompt=prompt,
             size=size,
             quality=quality,
-            save_path=output_path 
+            save_path=output_path
         )
-        
-        # Clean up temporary files
-        # if os.path.exists(temp_image_path):
-        #     os.remove(temp_image_path)
-        
+        spool.close()
+
         # Return appropriate response
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -313,40 +395,30 @@ async def edit_image_base64_endpoint(request: Base64ImageEditRequest):
     Designed for integration with n8n workflows where you have base64 image data.
     """
     try:
-        # Create temporary directory if it doesn't exist
-        os.makedirs("temp", exist_ok=True)
-        
-        # Decode base64 data and save to temporary file
+        # Decode base64 data; the decoded bytes go straight to the editor
+        # without a tempfile round-trip
         try:
             image_data = base64.b64decode(request.image_data)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid base64 image data: {str(e)}")
-        
-        # Save decoded image to temporary file
-        temp_image_path = f"temp/{uuid.uuid4()}.png"
-        with open(temp_image_path, "wb") as f:
-            f.write(image_data)
-        
+
         # Generate output path
         output_path = f"temp/output_{uuid.uuid4()}.png"
-        
-        # Call the image editor
-        result = edit_image(
-            image_file=temp_image_path,
+
+        # Call the image editor off the event loop (blocking OpenAI call)
+        result = await run_in_threadpool(
+            edit_image,
+            image_file=image_data,
             prompt=request.prompt,
             size=request.size,
             quality=request.quality,
-            save_path=output_path 
+            save_path=output_path
         )
-        
-        # Clean up temporary files
-        # if os.path.exists(temp_image_path):
-        #     os.remove(temp_image_path)
-        
+
         # Return appropriate response
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
-        
+
         # If file was saved and user wants the file, return it
         if request.return_format == "file" and "saved_path" in result and os.path.exists(result["saved_path"]):
             return FileResponse(
@@ -354,7 +426,7 @@ async def edit_image_base64_endpoint(request: Base64ImageEditRequest):
                 media_type="image/png",
                 filename="edited_image.png"
             )
-        
+
         # Add video_prompt to the result
         result["video_prompt"] = request.video_prompt
         
@@ -364,7 +436,59 @@ async def edit_image_base64_endpoint(request: Base64ImageEditRequest):
         raise HTTPException(status_code=500, detail=f"Error editing image: {str(e)}")
 
 
-@router.post("/scene-image", response_model=SceneImageResponse)
+@router.post("/edit-image-raw", response_model=ImageEditResponse)
+async def edit_image_raw_endpoint(
+    request: Request,
+    prompt: str,
+    size: str = "1024x1024",
+    quality: str = "high",
+    video_prompt: Optional[str] = None
+):
+    """
+    Edit an image posted as raw bytes (application/octet-stream).
+
+    This skips the JSON + base64 ingress path entirely: the body is the
+    image itself, so there is no 4/3x-inflated payload to parse and no
+    second decode pass. Prompt and options come in as query parameters.
+
+    Designed for integration with n8n workflows.
+    """
+    try:
+        image_bytes = await request.body()
+        if not image_bytes:
+            raise HTTPException(status_code=400, detail="Empty request body; send the raw image bytes")
+
+        # Generate output path
+        output_path = f"temp/output_{uuid.uuid4()}.png"
+
+        # Call the image editor off the event loop (blocking OpenAI call)
+        result = await run_in_threadpool(
+            edit_image,
+            image_file=image_bytes,
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            save_path=output_path
+        )
+
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+
+        # Add video_prompt to the result
+        result["video_prompt"] = video_prompt
+
+        return result
+
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=f"Error editing image: {str(e)}")
+
+
+# response_model=None on the hot per-scene endpoints: the handlers build
+# trusted dicts, and skipping Pydantic re-validation of multi-MB base64
+# payloads lets orjson serialize them directly
+@router.post("/scene-image", response_model=None)
 async def scene_image_endpoint(request: SceneImageRequest):
     """
     Download an image from a URL and return its base64 data along with scene information.
@@ -375,32 +499,20 @@ async def scene_image_endpoint(request: SceneImageRequest):
     Designed for integration with n8n workflows.
     """
     try:
-        # Create scene-specific directory
-        scene_dir = f"temp/scene_{request.scene_number}"
-        os.makedirs(scene_dir, exist_ok=True)
-        
-        # Download the image
-        download_result = download_image_from_url(
-            image_url=request.image_url,
-            save_directory=scene_dir
-        )
-        
-        if not download_result["success"]:
-            return {
-                "success": False,
-                "error": download_result.get("error", "Unknown error downloading image")
-            }
-        
-        # Read the file and convert to base64
+        # Download the image into memory and base64-encode it directly,
+        # skipping the write-to-disk/read-back round-trip
         try:
-            with open(download_result["file_path"], "rb") as image_file:
-                image_data = base64.b64encode(image_file.read()).decode("utf-8")
-        except Exception as e:
+            response = await get_http_client().get(request.image_url)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
             return {
                 "success": False,
-                "error": f"Error converting image to base64: {str(e)}"
+                "error": f"Error downloading image: {str(e)}"
             }
-        
+
+        # SIMD-accelerated encode; multi-MB images are the norm here
+        image_data = pybase64.b64encode_as_string(response.content)
+
         # Prepare the response
         return {
             "success": True,
@@ -417,6 +529,74 @@ async def scene_image_endpoint(request: SceneImageRequest):
         }
 
 
+@router.post("/scenes/batch", response_model=SceneBatchResponse)
+async def scene_batch_endpoint(request: SceneBatchRequest):
+    """
+    Process multiple scene images concurrently.
+
+    For each scene this downloads the source image and runs the image edit,
+    fanning all scenes out with asyncio.gather instead of the serial
+    per-scene calls an n8n loop would make. The edited image is returned
+    as base64 data ready for the runway-generate endpoint.
+
+    Designed for integration with n8n workflows.
+    """
+    async def process_one(scene: SceneImageRequest) -> dict:
+        try:
+            response = await get_http_client().get(scene.image_url)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            return {
+                "success": False,
+                "scene_number": scene.scene_number,
+                "error": f"Error downloading image: {str(e)}"
+            }
+
+        result = await run_in_threadpool(
+            edit_image,
+            image_file=response.content,
+            prompt=scene.prompt,
+            size=scene.size,
+            quality=scene.quality
+        )
+
+        if "error" in result:
+            return {
+                "success": False,
+                "scene_number": scene.scene_number,
+                "error": result["error"]
+            }
+
+        return {
+            "success": True,
+            "scene_number": scene.scene_number,
+            "prompt": scene.prompt,
+            "video_prompt": scene.video_prompt,
+            "image_data": result.get("b64_json")
+        }
+
+    results = await asyncio.gather(
+        *(process_one(scene) for scene in request.scenes),
+        return_exceptions=True
+    )
+
+    processed = []
+    for scene, result in zip(request.scenes, results):
+        if isinstance(result, Exception):
+            processed.append({
+                "success": False,
+                "scene_number": scene.scene_number,
+                "error": f"Error processing scene image: {str(result)}"
+            })
+        else:
+            processed.append(result)
+
+    return {
+        "success": all(item["success"] for item in processed),
+        "results": processed
+    }
+
+
 @router.post("/runway-generate", response_model=RunwayMLResponse)
 async def runway_generate_endpoint(request: RunwayMLRequest):
     """
@@ -433,84 +613,70 @@ async def runway_generate_endpoint(request: RunwayMLRequest):
         if not api_key:
             raise HTTPException(status_code=500, detail="RunwayML API key not configured")
         
-        # Prepare the request payload
+        # Prepare the request payload once; the data-URI prefix check avoids
+        # re-encoding an image that already carries one
         payload = {
             "promptImage": f"data:image/png;base64,{request.image_data}" if not request.image_data.startswith("data:") else request.image_data,
-            "prompt": request.prompt
+            "promptText": request.prompt,
+            "model": request.model_id,
+            "duration": 5,
+            "ratio": "1280:720"
         }
-        
+
         # Add additional parameters if provided
         if request.params:
             payload.update(request.params)
+
+        # Make the API request on the shared client (headers configured once)
+        client = get_runway_client()
+        response = await client.post("/v1/image_to_video", json=payload)
+
+        # Check for errors
+        if response.status_code != 200:
+            return {
+                "success": False,
+                "error": f"RunwayML API error: {response.status_code} - {response.text}"
+            }
+        
+        # Process the response
+        response_data = response.json()
         
-        # Set up headers
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "X-Runway-Version": settings.RUNWAY_API_VERSION,
-            "User-Agent": "RunwayML API/1.0"
+        # Print the response data for debugging
+        print("RunwayML API Response:", response_data)
+        print(response_data)
+        
+        # Return the result
+        result = {
+            "success": True
         }
         
-        # Make the API request
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{settings.RUNWAY_API_BASE_URL}/v1/image_to_video",
-                json={
-                    "promptImage": f"data:image/png;base64,{request.image_data}" if not request.image_data.startswith("data:") else request.image_data,
-                    "promptText": request.prompt,
-                    "model": request.model_id,
-                    "duration": 5,
-                    "ratio": "1280:720"
-                },
-                headers=headers
-            )
-            
-            # Check for errors
-            if response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"RunwayML API error: {response.status_code} - {response.text}"
-                }
-            
-            # Process the response
-            response_data = response.json()
-            
-            # Print the response data for debugging
-            print("RunwayML API Response:", response_data)
-            print(response_data)
-            
-            # Return the result
-            result = {
-                "success": True
-            }
-            
-            # Add task_id if present
-            if "taskId" in response_data:
-                result["task_id"] = response_data["taskId"]
-            elif "id" in response_data:
-                result["task_id"] = response_data["id"]
-                
-            # Log the task ID for debugging
-            print(f"Task ID: {result['task_id']}")
-            
-            # Add URL or data based on what's in the response
-            if "url" in response_data:
-                result["result_url"] = response_data["url"]
-            if "data" in response_data:
-                result["result_data"] = response_data["data"]
-                
-            # Include the full response for debugging
-            result["raw_response"] = response_data
+        # Add task_id if present
+        if "taskId" in response_data:
+            result["task_id"] = response_data["taskId"]
+        elif "id" in response_data:
+            result["task_id"] = response_data["id"]
             
-            return result
+        # Log the task ID for debugging
+        print(f"Task ID: {result['task_id']}")
+        
+        # Add URL or data based on what's in the response
+        if "url" in response_data:
+            result["result_url"] = response_data["url"]
+        if "data" in response_data:
+            result["result_data"] = response_data["data"]
             
+        # Include the full response for debugging
+        result["raw_response"] = response_data
+        
+        return result
+        
     except Exception as e:
         return {
             "success": False,
             "error": f"Error generating content with RunwayML: {str(e)}"
         }
 
-@router.post("/runway-task-status", response_model=RunwayTaskResponse)
+@router.post("/runway-task-status", response_model=None)
 async def runway_task_status_endpoint(request: RunwayTaskRequest):
     """
     Check the status of a RunwayML task.
@@ -526,44 +692,33 @@ async def runway_task_status_endpoint(request: RunwayTaskRequest):
         if not api_key:
             raise HTTPException(status_code=500, detail="RunwayML API key not configured")
         
-        # Set up headers
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "X-Runway-Version": settings.RUNWAY_API_VERSION,
-            "User-Agent": "RunwayML API/1.0"
-        }
-        
-        # Make the API request
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{settings.RUNWAY_API_BASE_URL}/v1/tasks/{request.task_id}",
-                headers=headers
-            )
-            
-            # Check for errors
-            if response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"RunwayML API error: {response.status_code} - {response.text}"
-                }
-            
-            # Process the response
-            task_data = response.json()
-            
-            # Return the result
-            result = {
-                "success": True,
-                "task_id": request.task_id,
-                "status": task_data.get("status"),
-                "progress": task_data.get("progress")
+        # Make the API request on the shared client (headers configured once)
+        client = get_runway_client()
+        response = await client.get(f"/v1/tasks/{request.task_id}")
+
+        # Check for errors
+        if response.status_code != 200:
+            return {
+                "success": False,
+                "error": f"RunwayML API error: {response.status_code} - {response.text}"
             }
-            
-            # Add output if available
-            if "output" in task_data:
-                result["output"] = task_data["output"]
-            
-            return result
+
+        # Process the response
+        task_data = response.json()
+
+        # Return the result
+        result = {
+            "success": True,
+            "task_id": request.task_id,
+            "status": task_data.get("status"),
+            "progress": task_data.get("progress")
+        }
+
+        # Add output if available
+        if "output" in task_data:
+            result["output"] = task_data["output"]
+
+        return result
             
     except Exception as e:
         return {
@@ -587,148 +742,94 @@ async def runway_download_video_endpoint(request: RunwayVideoDownloadRequest):
         if not api_key:
             raise HTTPException(status_code=500, detail="RunwayML API key not configured")
         
-        # Set up headers
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "X-Runway-Version": settings.RUNWAY_API_VERSION,
-            "User-Agent": "RunwayML API/1.0"
-        }
+        # First check the task status on the shared client
+        client = get_runway_client()
+        status_response = await client.get(f"/v1/tasks/{request.task_id}")
         
-        # First check the task status
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            status_response = await client.get(
-                f"{settings.RUNWAY_API_BASE_URL}/v1/tasks/{request.task_id}",
-                headers=headers
-            )
-            
-            # Check for errors
-            if status_response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"RunwayML API error: {status_response.status_code} - {status_response.text}"
-                }
-            
-            # Process the response
-            task_data = status_response.json()
-            
-            # Check if the task is complete
-            # RunwayML API uses "SUCCEEDED" status instead of "COMPLETED"
-            if task_data.get("status") not in ["COMPLETED", "SUCCEEDED"]:
-                return {
-                    "success": False,
-                    "error": f"Task is not completed yet. Current status: {task_data.get('status')}"
-                }
-            
-            # Print the task data for debugging
-            print("Task data:", task_data)
-            
-            # Get the video URL from the output
-            if "output" not in task_data:
-                return {
-                    "success": False,
-                    "error": "No output found in the task data"
-                }
-                
-            # Handle different output formats (array or dictionary)
-            output = task_data["output"]
-            video_url = None
-            
-            if isinstance(output, list) and len(output) > 0:
-                # If output is an array, use the first item as the video URL
-                video_url = output[0]
-                print(f"Using array output: {video_url}")
-            elif isinstance(output, dict) and "video" in output:
-                # If output is a dictionary with a video field, use that
-                video_url = output["video"]
-                print(f"Using dictionary output: {video_url}")
-            else:
-                return {
-                    "success": False,
-                    "error": f"Unexpected output format: {output}"
-                }
-                
-            if not video_url:
-                return {
-                    "success": False,
-                    "error": "No video URL found in the output"
-                }
+        # Check for errors
+        if status_response.status_code != 200:
+            return {
+                "success": False,
+                "error": f"RunwayML API error: {status_response.status_code} - {status_response.text}"
+            }
+        
+        # Process the response
+        task_data = status_response.json()
+        
+        # Check if the task is complete
+        # RunwayML API uses "SUCCEEDED" status instead of "COMPLETED"
+        if task_data.get("status") not in ["COMPLETED", "SUCCEEDED"]:
+            return {
+                "success": False,
+                "error": f"Task is not completed yet. Current status: {task_data.get('status')}"
+            }
+        
+        # Print the task data for debugging
+        print("Task data:", task_data)
+        
+        # Get the video URL from the output
+        if "output" not in task_data:
+            return {
+                "success": False,
+                "error": "No output found in the task data"
+            }
             
-            # Create temp directory if it doesn't exist
-            os.makedirs("temp", exist_ok=True)
+        # Handle different output formats (array or dictionary)
+        output = task_data["output"]
+        video_url = None
+        
+        if isinstance(output, list) and len(output) > 0:
+            # If output is an array, use the first item as the video URL
+            video_url = output[0]
+            print(f"Using array output: {video_url}")
+        elif isinstance(output, dict) and "video" in output:
+            # If output is a dictionary with a video field, use that
+            video_url = output["video"]
+            print(f"Using dictionary output: {video_url}")
+        else:
+            return {
+                "success": False,
+                "error": f"Unexpected output format: {output}"
+            }
             
-            # Download the video
-            video_response = await client.get(video_url)
+        if not video_url:
+            return {
+                "success": False,
+                "error": "No video URL found in the output"
+            }
+        
+        # Stream the video to a temporary file with a more predictable name,
+        # on the general-purpose client (the Runway client would send the
+        # API Authorization header to the CDN). Streaming in 1 MB chunks
+        # keeps peak memory flat however large the MP4 is.
+        video_filename = f"runway_video_{request.task_id}.mp4"
+        temp_video_path = f"temp/{video_filename}"
+        async with get_http_client().stream("GET", video_url) as video_response:
             if video_response.status_code != 200:
                 return {
                     "success": False,
-                    "error": f"Error downloading video: {video_response.status_code} - {video_response.text}"
+                    "error": f"Error downloading video: {video_response.status_code}"
                 }
-            
-            # Save the video to a temporary file with a more predictable name
-            video_filename = f"runway_video_{request.task_id}.mp4"
-            temp_video_path = f"temp/{video_filename}"
-            with open(temp_video_path, "wb") as f:
-                f.write(video_response.content)
-            
-            # Create a download URL for the video file
-            download_url = f"/download/{video_filename}"
-            
-            # Return the result
-            return {
-                "success": True,
-                "video_url": video_url,  # Original RunwayML URL
-                "download_url": download_url  # Local download URL
-            }
-            
+            async with aiofiles.open(temp_video_path, "wb") as f:
+                async for chunk in video_response.aiter_bytes(1 << 20):
+                    await f.write(chunk)
+        
+        # Create a download URL for the video file
+        download_url = f"/download/{video_filename}"
+        
+        # Return the result
+        return {
+            "success": True,
+            "video_url": video_url,  # Original RunwayML URL
+            "download_url": download_url  # Local download URL
+        }
+        
     except Exception as e:
         return {
             "success": False,
             "error": f"Error downloading video from RunwayML: {str(e)}"
         }
 
-@router.get("/download/{filename:path}")
-async def download_file(filename: str):
-    """
-    Download a file by filename.
-    
-    This endpoint serves files from the temp directory and its subdirectories.
-    It automatically detects the appropriate media type based on file extension.
-    """
-    try:
-        # Construct the file path, ensuring no path traversal attacks
-        safe_filename = os.path.normpath(filename).lstrip('/\\')
-        file_path = os.path.join("temp", safe_filename)
-        
-        # Check if the file exists
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"File not found: {filename}")
-        
-        # Determine media type based on file extension
-        _, ext = os.path.splitext(filename)
-        media_type = "application/octet-stream"  # Default
-        
-        # Map common extensions to media types
-        if ext.lower() in [".mp4", ".mov", ".avi"]:
-            media_type = "video/mp4"
-        elif ext.lower() in [".mp3", ".wav", ".ogg"]:
-            media_type = f"audio/{ext.lower()[1:]}"
-        elif ext.lower() in [".jpg", ".jpeg"]:
-            media_type = "image/jpeg"
-        elif ext.lower() == ".png":
-            media_type = "image/png"
-        
-        # Return the file as a response
-        return FileResponse(
-            path=file_path,
-            filename=os.path.basename(filename),
-            media_type=media_type
-        )
-    except Exception as e:
-        if isinstance(e, HTTPException):
-            raise e
-        raise HTTPException(status_code=500, detail=f"Error downloading video: {str(e)}")
-
 @router.post("/combine-videos", response_model=VideoCombineResponse)
 async def combine_videos_endpoint(request: VideoCombineRequest):
     """
@@ -750,16 +851,78 @@ async def combine_videos_endpoint(request: VideoCombineRequest):
             "error": f"Error combining videos: {str(e)}"
         }
 
-def get_amazon_product_details(url):
+# CSS selectors compiled once at import so each scrape pays a single tree
+# walk per field instead of re-compiling the selector every call
+_AMAZON_SELECTORS = {
+    "title": CSSSelector("#productTitle"),
+    "price": CSSSelector(".a-price .a-offscreen"),
+    "rating": CSSSelector("span.a-icon-alt"),
+    "number_of_reviews": CSSSelector("#acrCustomerReviewText"),
+    "availability": CSSSelector("#availability .a-declarative, #availability span"),
+    "brand": CSSSelector("#bylineInfo"),
+}
+_AMAZON_DETAILS_ROWS = CSSSelector("#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr")
+_AMAZON_DESCRIPTION_P = CSSSelector("#productDescription p")
+_AMAZON_DESCRIPTION = CSSSelector("#productDescription")
+
+# hiRes image URLs are regex-harvested straight from the raw page text;
+# locating the ImageBlockATF script via the parsed tree adds nothing
+_AMAZON_HIRES_RE = re.compile(r'"hiRes":"(https[^"]+)"')
+
+# TTL cache of scrape results keyed by URL; n8n dev loops re-scrape the
+# same product repeatedly, so repeats collapse to a dict lookup
+_SCRAPE_CACHE_TTL_SECONDS = 600
+_SCRAPE_CACHE_MAX_ENTRIES = 1024
+_scrape_cache = {}
+
+# Per-URL locks so concurrent cache misses for the same product trigger a
+# single scrape instead of a thundering herd against Amazon
+_scrape_locks = {}
+
+# Exact-match cache of /script results keyed by (session, message) hash;
+# retries and identical prompts skip the multi-second LLM roundtrip
+_SCRIPT_CACHE_TTL_SECONDS = 600
+_SCRIPT_CACHE_MAX_ENTRIES = 256
+_script_cache = {}
+
+async def get_amazon_product_details(url):
     """
     Scrape product details from an Amazon product URL.
-    
+
+    Uses the shared async HTTP client so the page fetch doesn't block the
+    event loop, and lxml's C parser so the inline parsing work keeps the
+    blocking window short.
+
     Args:
         url: Amazon product URL
-        
+
     Returns:
         Dictionary containing product details
     """
+    # Serve repeat scrapes of the same URL from the cache
+    cached = _scrape_cache.get(url)
+    if cached and time.monotonic() - cached[0] < _SCRAPE_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    # Single-flight: the first miss scrapes, everyone else waits for it
+    lock = _scrape_locks.setdefault(url, asyncio.Lock())
+    async with lock:
+        cached = _scrape_cache.get(url)
+        if cached and time.monotonic() - cached[0] < _SCRAPE_CACHE_TTL_SECONDS:
+            return cached[1]
+        result = await _scrape_amazon_product(url)
+        if "error" not in result:
+            # Bound the cache: drop the oldest entry once full (dicts keep
+            # insertion order, so the first key is the oldest)
+            if len(_scrape_cache) >= _SCRAPE_CACHE_MAX_ENTRIES:
+                _scrape_cache.pop(next(iter(_scrape_cache)))
+            _scrape_cache[url] = (time.monotonic(), result)
+        _scrape_locks.pop(url, None)
+        return result
+
+
+async def _scrape_amazon_product(url):
+    """Fetch and parse one Amazon product page (no caching)."""
     headers = {
         "User-Agent": (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -768,40 +931,37 @@ def get_amazon_product_details(url):
         )
     }
 
-    response = requests.get(url, headers=headers)
+    client = get_http_client()
+    response = await client.get(url, headers=headers)
     if response.status_code != 200:
         return {"error": f"Failed to fetch page. Status code: {response.status_code}"}
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    tree = lxml.html.fromstring(response.content)
 
     def extract_text(selector):
-        element = soup.select_one(selector)
-        return element.get_text(strip=True) if element else None
-
-    title = extract_text("#productTitle")
-    price = extract_text(".a-price .a-offscreen")
-    rating = extract_text("span.a-icon-alt")
-    reviews = extract_text("#acrCustomerReviewText")
-    availability = extract_text("#availability .a-declarative, #availability span")
-    brand = extract_text("#bylineInfo")
-    
+        elements = selector(tree)
+        return elements[0].text_content().strip() if elements else None
+
+    title = extract_text(_AMAZON_SELECTORS["title"])
+    price = extract_text(_AMAZON_SELECTORS["price"])
+    rating = extract_text(_AMAZON_SELECTORS["rating"])
+    reviews = extract_text(_AMAZON_SELECTORS["number_of_reviews"])
+    availability = extract_text(_AMAZON_SELECTORS["availability"])
+    brand = extract_text(_AMAZON_SELECTORS["brand"])
+
     # Product details table
     details = {}
-    for row in soup.select("#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr"):
-        heading = row.select_one("th, td")
-        value = row.select("td")
-        if heading and value:
-            details[heading.get_text(strip=True)] = value[-1].get_text(strip=True)
+    for row in _AMAZON_DETAILS_ROWS(tree):
+        cells = row.xpath("./th | ./td")
+        values = row.xpath("./td")
+        if cells and values:
+            details[cells[0].text_content().strip()] = values[-1].text_content().strip()
 
     # Description
-    description = extract_text("#productDescription p") or extract_text("#productDescription")
+    description = extract_text(_AMAZON_DESCRIPTION_P) or extract_text(_AMAZON_DESCRIPTION)
 
-    # Images (using regex to get from imageBlockData)
-    image_urls = []
-    image_data_script = soup.find("script", text=re.compile("ImageBlockATF"))
-    if image_data_script:
-        image_matches = re.findall(r'"hiRes":"(https[^"]+)"', image_data_script.string)
-        image_urls = list(set(image_matches))  # remove duplicates
+    # Images (regex over the raw page, preserving first-seen order)
+    image_urls = list(dict.fromkeys(_AMAZON_HIRES_RE.findall(response.text)))
 
     return {
         "title": title,
@@ -835,8 +995,11 @@ async def add_audio_to_video_endpoint(request: AudioToVideoRequest):
         A response containing the success status, output path, and download URL
     """
     try:
-        # Call the add_audio_to_video function
-        result = add_audio_to_video(request.video_path, request.audio_path, request.output_path)
+        # Call the add_audio_to_video function off the event loop; FFmpeg
+        # muxing can run for seconds on long clips
+        result = await run_in_threadpool(
+            add_audio_to_video, request.video_path, request.audio_path, request.output_path
+        )
         
         if not result["success"]:
             return {
@@ -852,7 +1015,6 @@ async def add_audio_to_video_endpoint(request: AudioToVideoRequest):
         
         # Create a symlink in the temp directory if the file is not already there
         if not output_path.startswith("temp/"):
-            os.makedirs("temp", exist_ok=True)
             temp_path = f"temp/{video_filename}"
             
             # Create a copy or symlink to the output file
@@ -905,8 +1067,10 @@ async def generate_speech_endpoint(request: TextToSpeechRequest):
         A response containing the success status, output path, and download URL
     """
     try:
-        # Call the generate_audio_from_text function
-        result = generate_audio_from_text(
+        # Call the generate_audio_from_text function off the event loop
+        # (blocking OpenAI TTS request)
+        result = await run_in_threadpool(
+            generate_audio_from_text,
             text=request.text,
             voice=request.voice,
             model=request.model,
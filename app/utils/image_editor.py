@@ -1,5 +1,7 @@
 from openai import OpenAI
 import base64
+import functools
+import io
 import os
 from typing import Optional, Union, BinaryIO
 from pathlib import Path
@@ -9,6 +11,15 @@ from app.core.logging_config import setup_logging
 # Set up logging
 logger = setup_logging(__name__)
 
+@functools.lru_cache(maxsize=None)
+def _get_client() -> OpenAI:
+    """Return the shared OpenAI client (built lazily, reused across calls).
+
+    The client carries its own pooled httpx.Client, so rebuilding it per
+    edit would pay a fresh TLS handshake on every call.
+    """
+    return OpenAI(api_key=settings.OPENAI_API_KEY_TPN)
+
 def edit_image(
     image_file: Union[str, Path, BinaryIO],
     prompt: str,
@@ -20,7 +31,7 @@ def edit_image(
     Edit an image using OpenAI's image editing API.
     
     Args:
-        image_file: Path to image file or file-like object
+        image_file: Path to image file, raw image bytes, or file-like object
         prompt: Text prompt describing the desired edits
         mask_file: Optional path to mask file or file-like object
         size: Image size (1024x1024, 1024x1792, 1792x1024)
@@ -32,22 +43,43 @@ def edit_image(
         Dictionary with image URL or base64 data and save path if applicable
     """
     try:
-        # Initialize OpenAI client
-        client = OpenAI(api_key=settings.OPENAI_API_KEY_TPN)
-        
+        # Reuse the shared OpenAI client
+        client = _get_client()
+
+        # Accept raw bytes and file-like objects directly so callers holding
+        # the image in memory don't need a tempfile round-trip
+        if isinstance(image_file, bytes):
+            image_file = io.BytesIO(image_file)
+        if hasattr(image_file, "read"):
+            if not getattr(image_file, "name", None):
+                # The API infers the mimetype from the filename
+                try:
+                    image_file.name = "image.png"
+                except AttributeError:
+                    # Objects with a read-only name (SpooledTemporaryFile);
+                    # the SDK also accepts a (filename, fileobj) pair
+                    image_file = ("image.png", image_file)
+            image = image_file
+        else:
+            image = open(image_file, "rb")
+
         # Prepare API call parameters
         params = {
             "model": "gpt-image-1",  # Use DALL-E 3 for image editing
-            "image": image_file if isinstance(image_file, BinaryIO) else open(image_file, "rb"),
+            "image": image,
             "prompt": prompt,
             "n": 1,
             "size": size,
             "quality": quality
         }
-        
+
         # Call the API
         logger.info(f"Editing image with prompt: {prompt}")
-        response = client.images.edit(**params)
+        try:
+            response = client.images.edit(**params)
+        finally:
+            if image is not image_file:
+                image.close()
         
         result = {}
         
@@ -57,11 +89,13 @@ def edit_image(
             image_data = response.data[0].b64_json
             result["b64_json"] = image_data
             
-            # Save the image if requested
+            # Save the image if requested, decoding in slices (multiples of
+            # four base64 chars) so peak memory stays flat for large images
             if save_path:
-                image_bytes = base64.b64decode(image_data)
+                step = 1 << 20
                 with open(save_path, "wb") as f:
-                    f.write(image_bytes)
+                    for i in range(0, len(image_data), step):
+                        f.write(base64.b64decode(image_data[i:i + step]))
                 result["saved_path"] = save_path
                 logger.info(f"Image saved to {save_path}")
                 
@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import os
 import uuid
 from typing import Optional, Dict, Any
@@ -10,6 +11,11 @@ from app.core.logging_config import setup_logging
 # Set up logging
 logger = setup_logging(__name__)
 
+# Shared session so image downloads reuse pooled TCP/TLS connections
+# (most product images come from the same CDN host)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
 def download_image_from_url(
     image_url: str,
     save_directory: str = "temp",
@@ -40,7 +46,7 @@ def download_image_from_url(
         
         # Download the image
         logger.info(f"Downloading image from {image_url}")
-        response = requests.get(image_url, stream=True, timeout=10)
+        response = _session.get(image_url, stream=True, timeout=10)
         response.raise_for_status()
         
         # Save the image to disk
@@ -1,44 +1,99 @@
+import asyncio
+import threading
+import time
 from typing import Dict, List
 from langchain.tools import tool
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.core.settings import settings
 from app.core.logging_config import setup_logging
 
 # Set up logging
 logger = setup_logging(__name__)
 
+# Process-wide cap on in-flight vision calls. Concurrent sessions each run
+# the tool on their own event loop, so a thread-safe semaphore is the one
+# primitive that bounds them all together and keeps bursts inside the
+# OpenAI rate limits.
+_VISION_MAX_CONCURRENCY = 8
+_vision_slots = threading.BoundedSemaphore(_VISION_MAX_CONCURRENCY)
+
+# TTL cache of analyses keyed by image URL; the same product images recur
+# across script revisions, and each hit skips a paid vision call.
+# Bounded: when full the oldest insertion is dropped so arbitrary URL
+# input cannot grow the dict without limit
+_ANALYSIS_CACHE_TTL_SECONDS = 3600
+_ANALYSIS_CACHE_MAX_ENTRIES = 512
+_analysis_cache = {}
+
+async def _analyze_image(openai_client: AsyncOpenAI, image_url: str) -> str:
+    """Analyze a single image with the vision model."""
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Please analyze this image and extract the details."},
+                {"type": "image_url", "image_url": {"url": image_url}},
+            ],
+        }
+    ]
+    await asyncio.to_thread(_vision_slots.acquire)
+    try:
+        response = await openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            max_tokens=500,
+        )
+    finally:
+        _vision_slots.release()
+    return response.choices[0].message.content
+
+async def _analyze_images(image_urls: List[str]) -> List[str]:
+    """Fan all vision calls out concurrently on one async client."""
+    openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    try:
+        return await asyncio.gather(
+            *(_analyze_image(openai_client, url) for url in image_urls)
+        )
+    finally:
+        await openai_client.close()
+
 @tool
 def process_multi_images(image_urls: List[str]) -> Dict[str, str]:
     """
-    Process a list of images and return their details sequentially.
-    
+    Process a list of images and return their details.
+
     Args:
         image_urls: List of URLs pointing to images to analyze
-        
+
     Returns:
         Dictionary mapping image URLs to their analysis
     """
     results = {}
     try:
-        openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        for i, image_url in enumerate(image_urls, start=1):
-            logger.info(f"Processing image {i}: {image_url}")
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Please analyze this image and extract the details."},
-                        {"type": "image_url", "image_url": {"url": image_url}},
-                    ],
-                }
-            ]
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=500,
-            )
-            results[image_url] = response.choices[0].message.content
-        logger.info(f"Processed {len(image_urls)} images successfully")
+        # Serve repeats from the cache and only analyze the misses
+        now = time.monotonic()
+        pending = []
+        for image_url in image_urls:
+            cached = _analysis_cache.get(image_url)
+            if cached and now - cached[0] < _ANALYSIS_CACHE_TTL_SECONDS:
+                results[image_url] = cached[1]
+            else:
+                pending.append(image_url)
+
+        # All requests run concurrently, so total latency is roughly the
+        # slowest call instead of the sum of all of them. The tool itself
+        # stays sync because the agent executor invokes tools synchronously.
+        if pending:
+            analyses = asyncio.run(_analyze_images(pending))
+            for image_url, analysis in zip(pending, analyses):
+                if len(_analysis_cache) >= _ANALYSIS_CACHE_MAX_ENTRIES:
+                    _analysis_cache.pop(next(iter(_analysis_cache)))
+                _analysis_cache[image_url] = (time.monotonic(), analysis)
+                results[image_url] = analysis
+        logger.info(
+            f"Processed {len(image_urls)} images ({len(pending)} analyzed, "
+            f"{len(image_urls) - len(pending)} from cache)"
+        )
     except Exception as e:
         logger.error(f"Error processing images: {str(e)}")
         results["error"] = str(e)
@@ -4,43 +4,66 @@ Video combiner utility functions.
 This module provides functions for combining multiple videos into a single video.
 """
 
+import asyncio
+import hashlib
 import os
 import uuid
+import aiofiles
 import httpx
 import subprocess
 from typing import List, Dict, Any, Optional
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from add_audio_to_video import _has_nvenc
+
+# Set up logging (configuration is the application's job, see main.py)
 logger = logging.getLogger(__name__)
 
+# Shared client so concurrent downloads reuse pooled connections instead
+# of paying a TLS handshake per video
+_client: Optional[httpx.AsyncClient] = None
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared httpx.AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=60.0, follow_redirects=True)
+    return _client
+
+def _stat_ok(path: str) -> bool:
+    """Return True if path exists and is non-empty (one stat syscall)."""
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
 async def download_video(url: str, output_path: str) -> bool:
     """
     Download a video from a URL to a local file.
-    
+
     Args:
         url: The URL of the video to download
         output_path: The path where the video should be saved
-        
+
     Returns:
         bool: True if download was successful, False otherwise
     """
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(url)
-            
+        # Stream in 1 MB chunks so peak memory stays flat per download
+        # even when several 4K clips are in flight concurrently
+        async with _get_client().stream("GET", url) as response:
             if response.status_code != 200:
-                logger.error(f"Error downloading video: {response.status_code} - {response.text}")
+                logger.error("Error downloading video: %d", response.status_code)
                 return False
-            
+
             # Save the video to the specified path
-            with open(output_path, "wb") as f:
-                f.write(response.content)
-                
-            return True
+            async with aiofiles.open(output_path, "wb") as f:
+                async for chunk in response.aiter_bytes(1 << 20):
+                    await f.write(chunk)
+
+        return True
     except Exception as e:
-        logger.error(f"Error downloading video: {str(e)}")
+        logger.error("Error downloading video: %s", e)
         return False
 
 async def combine_videos(video_paths: List[str], output_path: str) -> bool:
@@ -54,82 +77,96 @@ async def combine_videos(video_paths: List[str], output_path: str) -> bool:
     Returns:
         bool: True if combination was successful, False otherwise
     """
-    list_file_path = None
     try:
-        # Verify all input videos exist and have content
+        # Verify all input videos exist and have content (one stat each)
         for i, path in enumerate(video_paths):
-            if not os.path.exists(path):
-                logger.error(f"Input video {i+1} does not exist: {path}")
+            if not _stat_ok(path):
+                logger.error("Input video %d is missing or empty: %s", i + 1, path)
                 return False
-            if os.path.getsize(path) == 0:
-                logger.error(f"Input video {i+1} is empty: {path}")
-                return False
-        
-        # Create a temporary file listing all videos to combine
-        temp_dir = os.path.abspath("temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        list_file_path = os.path.join(temp_dir, f"video_list_{uuid.uuid4()}.txt")
-        
-        logger.info(f"Creating concat file at {list_file_path}")
-        with open(list_file_path, "w") as f:
-            for video_path in video_paths:
-                # Use absolute paths to avoid any path issues
-                abs_path = os.path.abspath(video_path)
-                f.write(f"file '{abs_path}'\n")
-                logger.info(f"Added {abs_path} to concat list")
-        
-        # Verify the list file was created and has content
-        if not os.path.exists(list_file_path) or os.path.getsize(list_file_path) == 0:
-            logger.error(f"Failed to create concat list file or file is empty")
-            return False
-            
+
+        # Build the concat list in memory; the concat demuxer reads it from
+        # stdin, so there is no list tempfile to write, verify and clean up
+        # (absolute paths avoid any path issues)
+        list_bytes = "".join(
+            f"file '{os.path.abspath(video_path)}'\n" for video_path in video_paths
+        ).encode()
+
         # Use FFmpeg to combine the videos
         cmd = [
             "ffmpeg",
             "-y",  # Overwrite output file if it exists
             "-f", "concat",
             "-safe", "0",
-            "-i", list_file_path,
+            "-protocol_whitelist", "file,pipe",
+            "-i", "pipe:0",
             "-c", "copy",  # Copy streams without re-encoding
             output_path
         ]
-        
-        logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
-        
-        # Run the FFmpeg command
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
+
+        logger.info("Running FFmpeg command: %s", " ".join(cmd))
+
+        # Run FFmpeg as an async subprocess so the event loop keeps serving
+        # other requests during the concat. stdout is discarded and stderr
+        # is only decoded (tail only) when the command actually fails.
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
         )
-        
+        _, stderr = await process.communicate(input=list_bytes)
+
+        # Stream-copy concat silently breaks (or fails outright) when the
+        # inputs disagree on codec/timebase/resolution; fall back to a
+        # normalizing re-encode only in that case so homogeneous batches
+        # keep the fast lossless path
+        if process.returncode != 0:
+            stderr_tail = stderr.decode(errors="replace")[-2000:]
+            logger.warning("Stream-copy concat failed, retrying with re-encode: %s", stderr_tail)
+
+            # Use the NVENC hardware encoder for the fallback when the
+            # local FFmpeg build has it (same probe add_audio_to_video
+            # uses); software x264 otherwise
+            if _has_nvenc():
+                encoder_flags = ["-c:v", "h264_nvenc", "-preset", "p4"]
+            else:
+                encoder_flags = ["-c:v", "libx264", "-preset", "medium"]
+
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-f", "concat",
+                "-safe", "0",
+                "-protocol_whitelist", "file,pipe",
+                "-i", "pipe:0",
+                *encoder_flags,
+                "-c:a", "aac",
+                output_path
+            ]
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+            _, stderr = await process.communicate(input=list_bytes)
+
         # Check if the command was successful
         if process.returncode != 0:
-            logger.error(f"FFmpeg error: {process.stderr}")
+            stderr_tail = stderr.decode(errors="replace")[-2000:]
+            logger.error("FFmpeg error: %s", stderr_tail)
             return False
         
-        # Verify the output file was created and has content
-        if not os.path.exists(output_path):
-            logger.error(f"Output file was not created: {output_path}")
-            return False
-        if os.path.getsize(output_path) == 0:
-            logger.error(f"Output file is empty: {output_path}")
+        # Verify the output file was created and has content (one stat)
+        if not _stat_ok(output_path):
+            logger.error("Output file is missing or empty: %s", output_path)
             return False
             
-        logger.info(f"Successfully combined videos into {output_path}")
+        logger.info("Successfully combined videos into %s", output_path)
         return True
     except Exception as e:
-        logger.error(f"Error combining videos: {str(e)}")
+        logger.error("Error combining videos: %s", e)
         return False
-    finally:
-        # Clean up the temporary file
-        if list_file_path and os.path.exists(list_file_path):
-            try:
-                os.remove(list_file_path)
-                logger.info(f"Removed temporary file: {list_file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary file {list_file_path}: {str(e)}")
 
 async def combine_videos_from_urls(video_urls: List[str], output_dir: str = "combined_generated_videos") -> Dict[str, Any]:
     """
@@ -142,74 +179,60 @@ async def combine_videos_from_urls(video_urls: List[str], output_dir: str = "com
     Returns:
         Dict containing success status, path to the combined video, and any error message
     """
-    video_paths = []
-    list_file_path = None
-    
     try:
         # Generate a unique identifier for this batch of videos
         batch_id = str(uuid.uuid4())[:8]
-        
-        # Create a dedicated folder for this batch of videos
-        videos_dir = os.path.abspath(f"downloaded_videos/batch_{batch_id}")
+
+        # Downloads live in one shared directory with content-addressed
+        # names (hash of the source URL), so a clip that appears in
+        # several batches is fetched once and reused from disk after that
+        videos_dir = os.path.abspath("downloaded_videos")
         os.makedirs(videos_dir, exist_ok=True)
-        logger.info(f"Created directory for downloaded videos: {videos_dir}")
-        
+
         # Create output directory if it doesn't exist
         output_dir_abs = os.path.abspath(output_dir)
         os.makedirs(output_dir_abs, exist_ok=True)
-        
-        # Create temp directory if it doesn't exist
-        temp_dir = os.path.abspath("temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        
+
         # Generate a unique filename for the combined video
         combined_video_filename = f"combined_{batch_id}.mp4"
         combined_video_path = os.path.join(output_dir_abs, combined_video_filename)
-        
-        logger.info(f"Starting download of {len(video_urls)} videos for batch {batch_id}")
-        
-        # Download all videos with sequential naming
-        video_paths = []
-        for i, url in enumerate(video_urls):
-            # Create a sequentially named video file in the dedicated folder
-            video_filename = f"video_{i+1:03d}.mp4"
-            video_path = os.path.join(videos_dir, video_filename)
-            logger.info(f"Downloading video {i+1}/{len(video_urls)} to {video_path}")
-            
-            success = await download_video(url, video_path)
-            
-            if not success:
-                logger.error(f"Failed to download video {i+1} from URL: {url}")
-                return {
-                    "success": False,
-                    "error": f"Failed to download video {i+1} from URL: {url}"
-                }
-            
-            # Verify the file exists and has content
-            if not os.path.exists(video_path) or os.path.getsize(video_path) == 0:
-                logger.error(f"Downloaded video file {video_path} is missing or empty")
+
+        video_paths = [
+            os.path.join(
+                videos_dir, f"{hashlib.sha256(url.encode()).hexdigest()[:16]}.mp4"
+            )
+            for url in video_urls
+        ]
+
+        # Download only the clips not already cached, all concurrently;
+        # total wall time becomes roughly the slowest download instead of
+        # the sum
+        pending = [
+            (url, path)
+            for url, path in zip(video_urls, video_paths)
+            if not _stat_ok(path)
+        ]
+        logger.info(
+            "Batch %s: downloading %d of %d videos (%d cached)",
+            batch_id, len(pending), len(video_urls), len(video_urls) - len(pending)
+        )
+        results = await asyncio.gather(
+            *(download_video(url, path) for url, path in pending)
+        )
+
+        for (url, path), success in zip(pending, results):
+            if not success or not _stat_ok(path):
+                logger.error("Failed to download video from URL: %s", url)
                 return {
                     "success": False,
-                    "error": f"Downloaded video file {i+1} is missing or empty"
+                    "error": f"Failed to download video from URL: {url}"
                 }
-                
-            video_paths.append(video_path)
-            logger.info(f"Successfully downloaded video {i+1}/{len(video_urls)}")
-        
-        logger.info(f"All videos downloaded. Creating file list for FFmpeg")
-        
-        # Create a temporary file listing all videos to combine
-        list_file_path = os.path.join(temp_dir, f"video_list_{batch_id}.txt")
-        with open(list_file_path, "w") as f:
-            for video_path in video_paths:
-                # Use absolute paths to avoid any path issues
-                abs_path = os.path.abspath(video_path)
-                f.write(f"file '{abs_path}'\n")
-                logger.info(f"Added {abs_path} to concat list")
-        
-        logger.info(f"Starting FFmpeg to combine videos into {combined_video_path}")
-        
-        # Combine the videos
+
+        logger.info("Successfully downloaded %d videos", len(pending))
+
+        logger.info("Starting FFmpeg to combine videos into %s", combined_video_path)
+
+        # Combine the videos (combine_videos builds its own concat list)
         success = await combine_videos(video_paths, combined_video_path)
         
         if not success:
@@ -220,7 +243,7 @@ async def combine_videos_from_urls(video_urls: List[str], output_dir: str = "com
             }
         
         # Return the result
-        logger.info(f"Successfully combined videos into {combined_video_path}")
+        logger.info("Successfully combined videos into %s", combined_video_path)
         return {
             "success": True,
             "combined_video_path": combined_video_path,
@@ -229,17 +252,8 @@ async def combine_videos_from_urls(video_urls: List[str], output_dir: str = "com
             "video_count": len(video_paths)
         }
     except Exception as e:
-        logger.error(f"Error combining videos from URLs: {str(e)}")
+        logger.error("Error combining videos from URLs: %s", e)
         return {
             "success": False,
             "error": f"Error combining videos: {str(e)}"
         }
-    finally:
-        # Clean up only the temporary list file
-        logger.info("Cleaning up temporary files")
-        if list_file_path and os.path.exists(list_file_path):
-            os.remove(list_file_path)
-            logger.info(f"Removed temporary file list: {list_file_path}")
-            
-        # We're keeping all downloaded videos in the dedicated folder
-        # No need to remove them
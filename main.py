@@ -1,21 +1,37 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.staticfiles import StaticFiles
 import uvicorn
+import logging
 import os
 from dotenv import load_dotenv
 
-from app.api.routes import router as script_router
+from app.api.routes import router as script_router, close_http_clients
 from app.core.settings import settings
 
 # Load environment variables
 load_dotenv()
 
+# Configure logging once at the entry point; library modules only call
+# logging.getLogger and inherit this configuration
+logging.basicConfig(level=logging.INFO)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage shared resources (pooled HTTP clients) over the app's lifetime."""
+    yield
+    await close_http_clients()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Video Script Generator API",
     description="API for generating 30-second video scripts for products with scene-by-scene breakdown",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -30,6 +46,10 @@ app.add_middleware(
 # Include routers
 app.include_router(script_router)
 
+# Serve generated files straight from the temp directory; StaticFiles uses
+# sendfile so multi-MB videos never pass through a Python buffer
+app.mount("/download", StaticFiles(directory="temp"), name="download")
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -57,10 +77,13 @@ if __name__ == "__main__":
         print("Error: OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
         exit(1)
     
-    # Run the API server
+    # Run the API server on uvloop with the httptools parser; both are
+    # drop-in and noticeably faster than the stdlib loop/h11 defaults
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=True,
+        loop="uvloop",
+        http="httptools"
     )
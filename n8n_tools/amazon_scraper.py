@@ -8,8 +8,93 @@ It can be used directly in n8n AI agents to extract product information.
 
 import re
 import json
-import requests
-from bs4 import BeautifulSoup
+import time
+
+# Headers to mimic a browser
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/91.0.4472.124 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# requests and lxml are imported lazily on the first scrape so that
+# importing this module (e.g. from an n8n run that never scrapes) stays
+# cheap; after the first call both live in sys.modules and the lazy
+# lookups are free
+_SESSION = None
+
+def _get_session():
+    """Return the shared pooled session, importing requests on first use."""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter, Retry
+
+        # Shared session so batch scrapes reuse pooled TCP/TLS connections
+        # instead of paying a fresh handshake per request
+        _SESSION = requests.Session()
+        _SESSION.headers.update(HEADERS)
+        _SESSION.mount("https://", HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503])
+        ))
+    return _SESSION
+
+# CSS selectors compiled once on first scrape so each call pays a single
+# tree walk per field instead of re-compiling them every time
+_SELECTORS = None
+
+def _get_selectors():
+    """Return the compiled selector table, importing lxml on first use."""
+    global _SELECTORS
+    if _SELECTORS is None:
+        from lxml.cssselect import CSSSelector
+
+        _SELECTORS = {
+            "title": CSSSelector("#productTitle"),
+            "price": CSSSelector(".a-price .a-offscreen"),
+            "price_fallback": CSSSelector(".a-color-price"),
+            "rating": CSSSelector("span.a-icon-alt"),
+            "reviews_count": CSSSelector("#acrCustomerReviewText"),
+            "availability": CSSSelector("#availability .a-declarative, #availability span"),
+            "brand": CSSSelector("#bylineInfo"),
+            "features": CSSSelector("#feature-bullets li span.a-list-item"),
+            "description_p": CSSSelector("#productDescription p"),
+            "description": CSSSelector("#productDescription"),
+            "details_rows": CSSSelector(
+                "#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr, #detailBullets_feature_div li"
+            ),
+            "gallery_images": CSSSelector("#imgTagWrapperId img, #imageBlock img.a-dynamic-image"),
+        }
+    return _SELECTORS
+
+_HIRES_RE = re.compile(r'"hiRes":"(https[^"]+)"')
+_ASIN_RE = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})")
+
+def _canonical_url(url):
+    """Collapse a product URL to its canonical /dp/<ASIN> form.
+
+    Referral links carry long slugs and tracking query strings; the
+    canonical page is the same product with a smaller response, and it
+    gives every URL variant of one product a single cache entry.
+    """
+    match = _ASIN_RE.search(url)
+    if not match:
+        return url
+    host = url.split("/", 3)[2]
+    return f"https://{host}/dp/{match.group(1)}"
+
+# Simple TTL cache of scrape results keyed by URL; n8n runs frequently
+# re-ask for the same product, so repeats skip the fetch + parse.
+# Bounded: when full the oldest insertion is dropped so arbitrary URL
+# input cannot grow the dict without limit
+_CACHE_TTL_SECONDS = 3600
+_CACHE_MAX_ENTRIES = 1024
+_cache = {}
 
 def scrape_amazon_product(url):
     """
@@ -21,86 +106,86 @@ def scrape_amazon_product(url):
     Returns:
         dict: Dictionary containing product details
     """
-    # Set up headers to mimic a browser
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/91.0.4472.124 Safari/537.36"
-        ),
-        "Accept-Language": "en-US,en;q=0.9",
-    }
-    
+    # Fetch and cache by the canonical /dp/<ASIN> URL so every referral
+    # variant of a product shares one entry (and one download)
+    url = _canonical_url(url)
+    cached = _cache.get(url)
+    if cached and time.monotonic() - cached[0] < _CACHE_TTL_SECONDS:
+        return cached[1]
+
     try:
-        # Send request to Amazon
-        response = requests.get(url, headers=headers, timeout=10)
-        
+        import lxml.html
+
+        # Send request to Amazon on the shared pooled session
+        response = _get_session().get(url, timeout=10)
+
         # Check if request was successful
         if response.status_code != 200:
             return {
                 "success": False,
                 "error": f"Failed to fetch page. Status code: {response.status_code}"
             }
-        
-        # Parse HTML content
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Helper function to extract text from selectors
+
+        # Parse HTML content with lxml's C parser
+        tree = lxml.html.fromstring(response.content)
+        selectors = _get_selectors()
+
+        # Helper function to extract text from precompiled selectors
         def extract_text(selector):
-            element = soup.select_one(selector)
-            return element.get_text(strip=True) if element else None
-        
+            elements = selector(tree)
+            return elements[0].text_content().strip() if elements else None
+
         # Extract product details
         product = {
             "success": True,
-            "title": extract_text("#productTitle"),
-            "price": extract_text(".a-price .a-offscreen") or extract_text(".a-color-price"),
-            "rating": extract_text("span.a-icon-alt"),
-            "reviews_count": extract_text("#acrCustomerReviewText"),
-            "availability": extract_text("#availability .a-declarative, #availability span"),
-            "brand": extract_text("#bylineInfo"),
+            "title": extract_text(selectors["title"]),
+            "price": extract_text(selectors["price"]) or extract_text(selectors["price_fallback"]),
+            "rating": extract_text(selectors["rating"]),
+            "reviews_count": extract_text(selectors["reviews_count"]),
+            "availability": extract_text(selectors["availability"]),
+            "brand": extract_text(selectors["brand"]),
             "features": []
         }
-        
+
         # Extract bullet points/features
-        for feature in soup.select("#feature-bullets li span.a-list-item"):
-            text = feature.get_text(strip=True)
+        for feature in selectors["features"](tree):
+            text = feature.text_content().strip()
             if text and text != "":
                 product["features"].append(text)
-        
+
         # Extract product description
-        product["description"] = extract_text("#productDescription p") or extract_text("#productDescription")
-        
+        product["description"] = extract_text(selectors["description_p"]) or extract_text(selectors["description"])
+
         # Extract product details table
         product["details"] = {}
-        for row in soup.select("#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr, #detailBullets_feature_div li"):
-            if row.name == "li":
+        for row in selectors["details_rows"](tree):
+            if row.tag == "li":
                 # Handle detail bullets format
-                text = row.get_text(strip=True)
+                text = row.text_content().strip()
                 if ":" in text:
                     key, value = text.split(":", 1)
                     product["details"][key.strip()] = value.strip()
             else:
                 # Handle table format
-                heading = row.select_one("th, td")
-                value = row.select("td")
-                if heading and value:
-                    product["details"][heading.get_text(strip=True)] = value[-1].get_text(strip=True)
-        
+                cells = row.xpath("./th | ./td")
+                values = row.xpath("./td")
+                if cells and values:
+                    product["details"][cells[0].text_content().strip()] = values[-1].text_content().strip()
+
         # Extract images
         product["images"] = []
-        
+
         # Try to get images from image gallery
-        image_data_script = soup.find("script", text=re.compile("ImageBlockATF"))
-        if image_data_script:
-            image_matches = re.findall(r'"hiRes":"(https[^"]+)"', image_data_script.string)
+        for script_text in tree.xpath('//script[contains(text(), "ImageBlockATF")]/text()'):
+            image_matches = _HIRES_RE.findall(script_text)
             product["images"] = list(set(image_matches))  # remove duplicates
-        
+            break
+
         # If no images found, try alternate method
         if not product["images"]:
-            for img in soup.select("#imgTagWrapperId img, #imageBlock img.a-dynamic-image"):
+            for img in selectors["gallery_images"](tree):
                 src = img.get("src") or img.get("data-old-hires") or img.get("data-a-dynamic-image")
-                if src and "data-a-dynamic-image" in img.attrs:
+                if src and "data-a-dynamic-image" in img.attrib:
                     # Extract image URLs from data-a-dynamic-image attribute
                     try:
                         image_data = json.loads(src)
@@ -111,8 +196,11 @@ def scrape_amazon_product(url):
                     product["images"].append(src)
         
         # Clean up image URLs
-        product["images"] = [url for url in product["images"] if url.startswith("http")]
-        
+        product["images"] = [u for u in product["images"] if u.startswith("http")]
+
+        if len(_cache) >= _CACHE_MAX_ENTRIES:
+            _cache.pop(next(iter(_cache)))
+        _cache[url] = (time.monotonic(), product)
         return product
         
     except Exception as e:
@@ -1,23 +1,23 @@
+import functools
 import os
 import uuid
 import logging
 from typing import Annotated, TypedDict, Dict, Any, Optional, List
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
+# langchain_openai and the OpenAI SDK are imported lazily at their use
+# sites below; they dominate this module's import time and importing this
+# file should stay cheap for callers that never build an agent
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
-from openai import OpenAI
 from langchain.tools import tool
 
 from prompts.script_generator import SCRIPT_GENERATOR_PROMPT
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Logging configuration is left to the application entry point; the CLI
+# main() below configures it for standalone runs
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +27,8 @@ def process_multi_images(image_urls: List[str]) -> Dict[str, str]:
     """Process a list of images and return their details sequentially."""
     results = {}
     try:
+        from openai import OpenAI
+
         openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         for i, image_url in enumerate(image_urls, start=1):
             messages = [
@@ -44,9 +46,9 @@ def process_multi_images(image_urls: List[str]) -> Dict[str, str]:
                 max_tokens=500,
             )
             results[f"Image Detail {i}"] = response.choices[0].message.content
-        logger.info(f"Processed {len(image_urls)} images successfully")
+        logger.info("Processed %d images successfully", len(image_urls))
     except Exception as e:
-        logger.error(f"Error processing images: {str(e)}")
+        logger.error("Error processing images: %s", e)
         results["error"] = str(e)
     return results
 
@@ -78,6 +80,8 @@ class ScriptGeneratorAgent:
                 "OpenAI API key is required. Please provide it or set OPENAI_API_KEY environment variable."
             )
 
+        from langchain_openai import ChatOpenAI
+
         # Using gpt-4o-mini for better script generation quality
         self.llm = ChatOpenAI(
             temperature=0.7, api_key=self.api_key, model="gpt-4o-mini"
@@ -140,9 +144,9 @@ class ScriptGeneratorAgent:
         # Generate a session ID if not provided
         if not session_id:
             session_id = str(uuid.uuid4())
-            logger.info(f"Generated new session_id: {session_id}")
+            logger.info("Generated new session_id: %s", session_id)
         else:
-            logger.info(f"Using existing session_id: {session_id}")
+            logger.info("Using existing session_id: %s", session_id)
 
         # If image URLs are provided, include them in the product info
         if image_urls and len(image_urls) > 0:
@@ -150,7 +154,7 @@ class ScriptGeneratorAgent:
             enhanced_product_info = product_info + "\n\nProduct Images:\n"
             for i, url in enumerate(image_urls, 1):
                 enhanced_product_info += f"\nImage {i}: {url}"
-            logger.info(f"Added {len(image_urls)} image URLs to product info")
+            logger.info("Added %d image URLs to product info", len(image_urls))
         else:
             enhanced_product_info = product_info
 
@@ -177,13 +181,27 @@ class ScriptGeneratorAgent:
         return "Sorry, I couldn't generate a script for this product."
 
 
+@functools.lru_cache(maxsize=None)
+def get_script_generator_agent(api_key: str = None) -> ScriptGeneratorAgent:
+    """Return a shared ScriptGeneratorAgent, building it on first call.
+
+    Graph compilation and ChatOpenAI construction are not free, and a
+    fresh agent also throws away the MemorySaver holding prior sessions,
+    so callers should go through this instead of instantiating directly.
+    """
+    return ScriptGeneratorAgent(api_key)
+
+
 def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
     load_dotenv()
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("Please set OPENAI_API_KEY environment variable")
 
-    agent = ScriptGeneratorAgent(api_key)
+    agent = get_script_generator_agent(api_key)
 
     print("Script Generator started! Type 'q' or 'quit' to exit.")
     session_id = str(uuid.uuid4())
@@ -1,20 +1,32 @@
+import argparse
+import asyncio
+import functools
+import hashlib
 import os
+import re
+import time
 import uuid
 import json
 import logging
 from typing import Annotated, TypedDict, Dict, List, Any, Optional
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
+# langchain_openai, the OpenAI SDK and the scraper module (which builds
+# its own FastAPI app at import) are imported lazily at their use sites;
+# they dominate this module's import time and importing this file should
+# stay cheap for callers that never build an agent
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
-from openai import OpenAI
 
-# Import the Amazon product scraping function
-from amazon_product_scrapping import get_amazon_product_details
+# Persistent checkpointing is optional; without the sqlite extra the
+# agent falls back to the in-memory saver (state lost on restart)
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:
+    SqliteSaver = None
 
 # Configure logging
 logging.basicConfig(
@@ -37,42 +49,197 @@ class Scene(TypedDict):
     video_prompt: str
     image_url: str
 
+# Keep only the most recent messages in graph state. The checkpointer
+# serializes the full list on every turn, so unbounded history gives
+# quadratic write amplification over a long interactive session.
+_MESSAGE_WINDOW = 20
+
+def _windowed_add_messages(existing: list, new: list) -> list:
+    """add_messages, trimmed to the last _MESSAGE_WINDOW entries."""
+    return add_messages(existing, new)[-_MESSAGE_WINDOW:]
+
 # Define the state for our LangGraph workflow
 class ScriptWriterState(TypedDict):
     """State schema for the script writer graph."""
-    messages: Annotated[list[BaseMessage], add_messages]
+    messages: Annotated[list[BaseMessage], _windowed_add_messages]
     product_data: Dict[str, Any]
     image_analyses: Dict[str, str]
     scenes: List[Scene]
 
-# Image analysis function using OpenAI API
+# Shared clients, built lazily and reused. Each OpenAI/ChatOpenAI
+# instance carries its own pooled httpx client, so constructing one per
+# agent (or per call) pays a fresh TLS handshake for every connection.
+# The AsyncOpenAI client in _analyze_images stays per-batch because an
+# async client cannot be shared across the short-lived event loops that
+# asyncio.run creates.
+@functools.lru_cache(maxsize=None)
+def _get_openai_client(api_key: str) -> "OpenAI":
+    """Return the shared sync OpenAI client for an API key."""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, timeout=30.0, max_retries=5)
+
+@functools.lru_cache(maxsize=None)
+def _get_chat_llm(api_key: str) -> "ChatOpenAI":
+    """Return the shared script-writing LLM for an API key."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        temperature=0.7,
+        api_key=api_key,
+        model="gpt-4o",
+        timeout=60.0,
+        max_retries=3,
+        model_kwargs={"response_format": {"type": "json_object"}},
+    )
+
+# TTL cache of analyses keyed by image URL; Amazon CDN links are stable,
+# so an image seen in any earlier session skips the paid vision call.
+# Bounded like _script_cache: when full the oldest insertion is dropped
+_ANALYSIS_CACHE_TTL_SECONDS = 3600
+_ANALYSIS_CACHE_MAX_ENTRIES = 512
+_analysis_cache = {}
+
+# Image analysis functions using OpenAI API
+async def _analyze_image(openai_client: "AsyncOpenAI", image_url: str) -> str:
+    """Analyze a single image with the vision model."""
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Analyze this product image. Reply with short bullet points only: key features, dimensions/specifications if visible, and a count when the same object appears multiple times. No introductions or prose."},
+                {"type": "image_url", "image_url": {"url": image_url}},
+            ],
+        }
+    ]
+    response = await openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        max_tokens=300,
+    )
+    return response.choices[0].message.content
+
+async def _analyze_images(image_urls: List[str]) -> List[Any]:
+    """Fan all vision calls out concurrently on one async client.
+
+    The client retries transient 429/5xx responses with jittered backoff
+    and bounds each call with a timeout; one failing image surfaces as an
+    exception in its slot instead of aborting the whole batch.
+    """
+    from openai import AsyncOpenAI
+
+    openai_client = AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY, timeout=30.0, max_retries=5
+    )
+    try:
+        return await asyncio.gather(
+            *(_analyze_image(openai_client, url) for url in image_urls),
+            return_exceptions=True,
+        )
+    finally:
+        await openai_client.close()
+
 def process_multi_images(image_urls: List[str]) -> Dict[str, str]:
-    """Process a list of images and return their details sequentially."""
+    """Process a list of images and return their details.
+
+    The vision calls run concurrently, so total latency is roughly the
+    slowest call instead of the sum of all of them.
+    """
     results = {}
     try:
-        openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        for i, image_url in enumerate(image_urls, start=1):
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Please analyze this image and extract the details. Try to extract features, dimensions, specification and if multiple object is same count it "},
-                        {"type": "image_url", "image_url": {"url": image_url}},
-                    ],
-                }
-            ]
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=500,
-            )
-            results[image_url] = response.choices[0].message.content
-        logger.info(f"Processed {len(image_urls)} images successfully")
+        # Serve repeats from the cache and only analyze the misses
+        now = time.monotonic()
+        pending = []
+        for image_url in image_urls:
+            cached = _analysis_cache.get(image_url)
+            if cached and now - cached[0] < _ANALYSIS_CACHE_TTL_SECONDS:
+                results[image_url] = cached[1]
+            else:
+                pending.append(image_url)
+
+        if pending:
+            analyses = asyncio.run(_analyze_images(pending))
+            for image_url, analysis in zip(pending, analyses):
+                if isinstance(analysis, Exception):
+                    # Retries are exhausted at this point; drop the image
+                    # rather than failing the batch so the script still
+                    # generates from the remaining analyses
+                    logger.error(f"Error analyzing image {image_url}: {analysis}")
+                    continue
+                if len(_analysis_cache) >= _ANALYSIS_CACHE_MAX_ENTRIES:
+                    _analysis_cache.pop(next(iter(_analysis_cache)))
+                _analysis_cache[image_url] = (time.monotonic(), analysis)
+                results[image_url] = analysis
+        logger.info(
+            f"Processed {len(image_urls)} images ({len(pending)} analyzed, "
+            f"{len(image_urls) - len(pending)} from cache)"
+        )
     except Exception as e:
         logger.error(f"Error processing images: {str(e)}")
         results["error"] = str(e)
     return results
 
+# Regexes for salvaging JSON from free-form output, compiled once at
+# import instead of on every script run
+_SCENES_ARR_RE = re.compile(r'"scenes"\s*:\s*\[(.*?)\]', re.DOTALL)
+_FENCE_RE = re.compile(r'```json|```')
+
+def _extract_json_object(s: str) -> Optional[str]:
+    """Return the first complete top-level {...} block containing "scenes".
+
+    Walks the string once tracking brace depth and string/escape state.
+    Unlike a non-greedy brace regex this never returns a truncated
+    object, so there is no candidate list to sort and re-parse.
+    """
+    depth = 0
+    start = None
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(s):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                candidate = s[start:i + 1]
+                if '"scenes"' in candidate:
+                    return candidate
+    return None
+
+# Cache of script LLM responses keyed by a hash of the prompt inputs.
+# The script call is a stateless prompt->response map and dominates cost,
+# so a rerun on the same product (same title/details/analyses) can skip
+# the GPT-4o call entirely.
+_SCRIPT_CACHE_TTL_SECONDS = 600
+_SCRIPT_CACHE_MAX_ENTRIES = 128
+_script_cache = {}
+
+@functools.lru_cache(maxsize=32)
+def _format_details(details_key: str) -> str:
+    """Render the canonical details JSON with indentation, memoized.
+
+    Chat turns in one session pass the same product_data every time;
+    keying on the compact sort_keys dump makes the pretty-printing pass
+    run once per distinct product instead of once per turn.
+    """
+    return json.dumps(json.loads(details_key), indent=2)
+
+def _script_cache_key(inputs: Dict[str, Any]) -> str:
+    """Hash the chain inputs into a compact cache key."""
+    payload = json.dumps(inputs, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
 # Script writer prompts
 SCRIPT_WRITER_SYSTEM_PROMPT = """
 You are a professional script writer for product advertisements. 
@@ -117,16 +284,23 @@ class ScriptWriterAgent:
                 "OpenAI API key is required. Please provide it or set OPENAI_API_KEY environment variable."
             )
 
-        # Initialize OpenAI client for image analysis
-        self.openai_client = OpenAI(api_key=self.api_key)
-        
-        # Initialize LangChain LLM
-        self.llm = ChatOpenAI(
-            temperature=0.7, api_key=self.api_key, model="gpt-4o"
-        )
+        # Reuse the shared clients so repeated agent construction (and
+        # the CLI loop) never rebuilds connection pools. JSON mode makes
+        # the model emit a parseable object directly, so the regex
+        # salvage below is only a fallback rather than the normal path.
+        self.openai_client = _get_openai_client(self.api_key)
+        self.llm = _get_chat_llm(self.api_key)
         
-        # Initialize memory saver
-        self.memory = MemorySaver()
+        # Initialize the checkpointer. SQLite keeps session state out of
+        # the Python heap and survives restarts, so long-running sessions
+        # do not re-compute analyses after a redeploy.
+        if SqliteSaver is not None:
+            import sqlite3
+
+            conn = sqlite3.connect("scriptwriter_state.db", check_same_thread=False)
+            self.memory = SqliteSaver(conn)
+        else:
+            self.memory = MemorySaver()
         
         # Create the graph
         self.graph = self._create_graph()
@@ -197,14 +371,21 @@ class ScriptWriterAgent:
             ])
             
             # Format the product details for the prompt
-            formatted_details = json.dumps(product_data.get("product_details", {}), indent=2)
-            formatted_analyses = "\n\n".join([f"Image: {url}\n{analysis}" 
-                                    for url, analysis in image_analyses.items() 
-                                    if url != "error"])
+            formatted_details = _format_details(
+                json.dumps(product_data.get("product_details", {}), sort_keys=True)
+            )
+            # Clamp each analysis so a verbose vision response cannot
+            # balloon the script prompt (cost and latency scale with it);
+            # the generator feeds join directly, with no intermediate
+            # list, and empty analyses are dropped rather than wasting
+            # prompt tokens on a bare header line
+            formatted_analyses = "\n\n".join(f"Image: {url}\n{analysis[:1200]}"
+                                    for url, analysis in image_analyses.items()
+                                    if analysis and url != "error")
             
-            # Generate the script
-            chain = prompt | self.llm
-            response = chain.invoke({
+            # Generate the script, reusing a cached response when the
+            # exact same inputs were scripted recently
+            chain_inputs = {
                 "title": product_data.get("title", "Unknown Product"),
                 "price": product_data.get("price", "N/A"),
                 "brand": product_data.get("brand", "N/A"),
@@ -212,45 +393,53 @@ class ScriptWriterAgent:
                 "description": product_data.get("product_description", "No description available"),
                 "details": formatted_details,
                 "image_analyses": formatted_analyses
-            })
-            
+            }
+            cache_key = _script_cache_key(chain_inputs)
+            cached = _script_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < _SCRIPT_CACHE_TTL_SECONDS:
+                logger.info("Serving script from response cache")
+                content = cached[1]
+            else:
+                chain = prompt | self.llm
+                response = chain.invoke(chain_inputs)
+                content = response.content
+                if len(_script_cache) >= _SCRIPT_CACHE_MAX_ENTRIES:
+                    _script_cache.pop(next(iter(_script_cache)))
+                _script_cache[cache_key] = (time.monotonic(), content)
+
             # Parse the response to extract the scenes
             scenes = []
             try:
                 # Try to extract JSON from the response
-                content = response.content
                 if isinstance(content, str):
-                    # First try to find JSON content by looking for the most complete JSON object
-                    import re
-                    # Look for JSON objects with the scenes key
-                    json_pattern = r'\{[\s\S]*?"scenes"[\s\S]*?\}'
-                    json_matches = re.findall(json_pattern, content)
-                    
-                    # If we found potential JSON matches
-                    if json_matches:
-                        # Sort by length to try the largest/most complete JSON first
-                        json_matches.sort(key=len, reverse=True)
-                        
-                        for json_str in json_matches:
-                            try:
-                                # Try to clean up the JSON string
-                                # Remove any markdown code block markers
-                                clean_json = re.sub(r'```json|```', '', json_str).strip()
-                                scenes_data = json.loads(clean_json)
-                                if "scenes" in scenes_data and isinstance(scenes_data["scenes"], list):
-                                    scenes = scenes_data["scenes"]
-                                    logger.info(f"Successfully extracted {len(scenes)} scenes from JSON response")
-                                    break
-                            except json.JSONDecodeError as e:
-                                logger.warning(f"Failed to parse JSON: {e}. Trying next match.")
-                                continue
+                    # JSON mode normally returns a clean object; parse it
+                    # directly before falling back to regex extraction
+                    try:
+                        scenes_data = json.loads(content)
+                        if "scenes" in scenes_data and isinstance(scenes_data["scenes"], list):
+                            scenes = scenes_data["scenes"]
+                            logger.info(f"Parsed {len(scenes)} scenes directly from JSON response")
+                    except json.JSONDecodeError:
+                        pass
+
+                if not scenes and isinstance(content, str):
+                    # Scan for the first complete JSON object with a
+                    # scenes key (single pass, no regex backtracking)
+                    json_str = _extract_json_object(_FENCE_RE.sub('', content))
+                    if json_str:
+                        try:
+                            scenes_data = json.loads(json_str)
+                            if "scenes" in scenes_data and isinstance(scenes_data["scenes"], list):
+                                scenes = scenes_data["scenes"]
+                                logger.info(f"Successfully extracted {len(scenes)} scenes from JSON response")
+                        except json.JSONDecodeError as e:
+                            logger.warning(f"Failed to parse extracted JSON: {e}")
                     
                     # If we still don't have scenes, try a more aggressive approach
                     if not scenes:
                         logger.info("Trying alternative JSON extraction method")
                         # Try to extract just the scenes array
-                        scenes_pattern = r'"scenes"\s*:\s*\[(.*?)\]'
-                        scenes_match = re.search(scenes_pattern, content, re.DOTALL)
+                        scenes_match = _SCENES_ARR_RE.search(content)
                         
                         if scenes_match:
                             try:
@@ -327,6 +516,15 @@ class ScriptWriterAgent:
             "messages": result.get("messages", [])
         }
 
+    async def agenerate_script(self, product_data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+        """Async variant of generate_script for callers on an event loop.
+
+        The graph runs on a worker thread so the loop stays free to drive
+        other in-flight scripts; the checkpointer is synchronous, so the
+        graph itself cannot be awaited directly.
+        """
+        return await asyncio.to_thread(self.generate_script, product_data, session_id)
+
     def process_message(self, user_input: str, product_data: Dict[str, Any] = None, session_id: str = None) -> Dict[str, Any]:
         """
         Process a message in the context of script writing.
@@ -371,11 +569,42 @@ class ScriptWriterAgent:
             "messages": result.get("messages", [])
         }
 
+    async def aprocess_message(self, user_input: str, product_data: Dict[str, Any] = None, session_id: str = None) -> Dict[str, Any]:
+        """Async variant of process_message (see agenerate_script)."""
+        return await asyncio.to_thread(self.process_message, user_input, product_data, session_id)
+
+
+async def _run_batch(agent: "ScriptWriterAgent", urls: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """Script a list of product URLs concurrently, bounded by a semaphore.
+
+    Each URL is scraped on a worker thread and scripted via
+    agenerate_script, so total wall time approaches the slowest product
+    rather than the sum of all of them.
+    """
+    from amazon_product_scrapping import get_amazon_product_details
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def script_one(url: str) -> Dict[str, Any]:
+        async with semaphore:
+            product_data = await asyncio.to_thread(get_amazon_product_details, url)
+            if isinstance(product_data, dict) and "error" in product_data:
+                return {"url": url, "error": product_data["error"]}
+            result = await agent.agenerate_script(product_data)
+            return {"url": url, "scenes": result.get("scenes", [])}
+
+    return await asyncio.gather(*(script_one(url) for url in urls))
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate video scripts for Amazon products")
+    parser.add_argument("--batch", help="File with one Amazon product URL per line; processes them concurrently and prints JSON")
+    parser.add_argument("--concurrency", type=int, default=5, help="Maximum products scripted at once in batch mode")
+    args = parser.parse_args()
+
     # Load environment variables
     load_dotenv()
-    
+
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         print("Please set OPENAI_API_KEY environment variable or enter it now:")
@@ -388,6 +617,16 @@ def main():
     # Create the script writer agent
     agent = ScriptWriterAgent(api_key)
 
+    # Batch mode: fan the URLs out concurrently instead of blocking on
+    # the interactive loop
+    if args.batch:
+        with open(args.batch) as f:
+            urls = [line.strip() for line in f if line.strip()]
+        print(f"Scripting {len(urls)} products (concurrency {args.concurrency})...")
+        results = asyncio.run(_run_batch(agent, urls, args.concurrency))
+        print(json.dumps({"results": results}, indent=2))
+        return
+
     print("\n===== Amazon Product Script Writer =====\n")
     print("This tool generates video scripts for Amazon products.")
     print("It analyzes product data and images to create scene-by-scene scripts.\n")
@@ -397,6 +636,8 @@ def main():
 
     product_data = None
     if use_url:
+        from amazon_product_scrapping import get_amazon_product_details
+
         amazon_url = input("Enter Amazon product URL: ")
         print(f"\nFetching product data from {amazon_url}...")
         # Get the product data from the URL
@@ -1,12 +1,85 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import requests
 import streamlit as st
 from dotenv import load_dotenv
-from app.agents.script_writer_agent import script_writer_agent
+
+# orjson parses 2-5x faster than the stdlib; fall back quietly if absent
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+def _maybe_json(s: str):
+    """Parse s as a JSON object, or return None.
+
+    One strip and a first/last-character check reject plain-English
+    replies before the parser allocates anything.
+    """
+    s = s.strip()
+    if not s or s[0] != "{" or s[-1] != "}":
+        return None
+    try:
+        return _json_loads(s)
+    except ValueError:
+        return None
 
 # Load environment variables
 load_dotenv()
 
+@st.cache_resource(show_spinner=False)
+def get_agent():
+    """Import and return the script writer agent once per process.
+
+    The import pulls in the whole langchain/langgraph stack and builds
+    the LLM client, so it lives behind cache_resource instead of running
+    at module top on every rerun.
+    """
+    from app.agents.script_writer_agent import script_writer_agent
+
+    return script_writer_agent
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_image(url: str):
+    """Download an image once and cache the bytes across reruns."""
+    try:
+        return requests.get(url, timeout=5).content
+    except requests.RequestException:
+        return None
+
+# Hard ceiling on one agent run (the LLM itself retries with its own
+# 60s timeout; several tool + LLM rounds can legitimately take a while)
+_AGENT_TIMEOUT_SECONDS = 180
+
+@st.cache_resource(show_spinner=False)
+def _get_agent_executor() -> ThreadPoolExecutor:
+    """Return the process-wide executor for agent runs.
+
+    A persistent pool means a timed-out future is simply abandoned to
+    its worker thread; a per-call pool would block in shutdown(wait=True)
+    on exit until the hung invoke finished, defeating the timeout.
+    """
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-invoke")
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _invoke_agent(messages_json: str) -> str:
+    """Run the script writer agent, cached on the exact message list.
+
+    Streamlit reruns this whole script on every widget interaction; the
+    cache makes sure only a genuinely new conversation state triggers an
+    LLM call. The run happens on a worker thread with a hard timeout so
+    a hung upstream API surfaces as an error instead of an endless
+    spinner; the timeout propagates as FutureTimeoutError, which
+    cache_data does not cache, so retrying gets a fresh attempt.
+    """
+    messages = json.loads(messages_json)
+    future = _get_agent_executor().submit(get_agent().invoke, {"messages": messages})
+    result = future.result(timeout=_AGENT_TIMEOUT_SECONDS)
+    return result.get("output", "")
+
 # Set page configuration
 st.set_page_config(
     page_title="Video Script Generator",
@@ -37,9 +110,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'script' not in st.session_state:
-    st.session_state.script = None
+# Initialize session state in one idempotent pass; setdefault only
+# assigns when the key is missing, so reruns never clobber live state
+for _key, _default in {"script": None, "image_urls": [""], "chat_messages": []}.items():
+    st.session_state.setdefault(_key, _default)
 
 # Check if API key is available
 api_key = os.getenv("OPENAI_API_KEY")
@@ -81,10 +155,6 @@ with st.sidebar:
 st.header("Product Information")
 st.markdown("Provide details about your product. Include features, benefits, target audience, and any specific aspects you want to highlight.")
 
-# Initialize image_urls in session state if not present
-if 'image_urls' not in st.session_state:
-    st.session_state.image_urls = [""]
-
 # Function to add more image URL fields
 def add_image_url():
     st.session_state.image_urls.append("")
@@ -148,12 +218,12 @@ with st.form("script_form"):
                 # For now, we'll just pass the URL as the product info
                 product_info = f"Amazon product URL: {amazon_url}"
             
-            # Collect image URLs from session state
-            image_urls = []
-            for i in range(len(st.session_state.image_urls)):
-                url = st.session_state[f"image_url_{i}"]
-                if url and url.strip():
-                    image_urls.append(url)
+            # Collect image URLs from session state in one pass
+            image_urls = [
+                st.session_state[f"image_url_{i}"].strip()
+                for i in range(len(st.session_state.image_urls))
+                if st.session_state[f"image_url_{i}"].strip()
+            ]
             
             # Create a prompt for the script writer agent
             prompt = f"""
@@ -162,37 +232,41 @@ with st.form("script_form"):
         
             """
             
-            # Store the image URLs used for this generation
-            st.session_state.last_used_image_urls = image_urls.copy() if image_urls else []
-            
-            # Invoke the script writer agent
-            result = script_writer_agent.invoke({"messages": [{"content": prompt, "role": "user"}]})
-            
-            # Get the output from the result
-            script_text = result.get("output", "")
+            # Store the image URLs used for this generation; the list is
+            # freshly built above, so no defensive copy is needed
+            st.session_state.last_used_image_urls = image_urls
             
+            # Invoke the script writer agent (cached per message list)
             try:
-                # Try to parse as JSON
-                script_json = json.loads(script_text)
-                st.session_state.script = script_json
-            except json.JSONDecodeError:
-                # If not valid JSON, store as text
-                st.session_state.script = {"raw_text": script_text}
-
-# Display generated script
-if st.session_state.script:
-    st.header("Generated Script")
-    
+                script_text = _invoke_agent(json.dumps([{"content": prompt, "role": "user"}]))
+            except FutureTimeoutError:
+                st.error(f"Script generation timed out after {_AGENT_TIMEOUT_SECONDS}s. Please try again.")
+                st.stop()
+
+            # Parse as JSON, storing raw text when it is not valid JSON
+            script_json = _maybe_json(script_text)
+            st.session_state.script = script_json if script_json is not None else {"raw_text": script_text}
+
+# Display generated script. The fragment scopes reruns: typing in the
+# chat box or editing image URL fields no longer re-renders every scene
+# expander, only interactions inside this region do.
+@st.fragment
+def render_script():
+    """Render the generated script, its source images and the download button."""
     # Display images used for this generation if any
     if hasattr(st.session_state, 'last_used_image_urls') and st.session_state.last_used_image_urls:
         with st.expander("Images Used for Analysis", expanded=False):
             st.markdown("The following images were analyzed to enhance the script:")
-            cols = st.columns(min(3, len(st.session_state.last_used_image_urls)))
-            for i, url in enumerate(st.session_state.last_used_image_urls):
-                if url.strip():
-                    with cols[i % len(cols)]:
-                        st.image(url, width=200)
-                        st.markdown(f"[Image {i+1}]({url})")
+            urls = [u for u in st.session_state.last_used_image_urls if u.strip()]
+            # Prefetch all images concurrently (cached after the first
+            # rerun) instead of letting st.image fetch them one by one
+            with ThreadPoolExecutor(max_workers=min(len(urls), 8)) as executor:
+                image_bytes = list(executor.map(_fetch_image, urls))
+            cols = st.columns(min(3, len(urls)))
+            for i, (url, data) in enumerate(zip(urls, image_bytes)):
+                with cols[i % len(cols)]:
+                    st.image(data if data else url, width=200)
+                    st.markdown(f"[Image {i+1}]({url})")
     
     # Check if it's properly formatted JSON
     if "raw_text" in st.session_state.script:
@@ -227,32 +301,30 @@ if st.session_state.script:
             mime="application/json"
         )
 
+if st.session_state.script:
+    st.header("Generated Script")
+    render_script()
+
 # Chat interface
 st.header("Chat with Script Writer Assistant")
 
-# Initialize chat history
-if "chat_messages" not in st.session_state:
-    st.session_state.chat_messages = []
-
 # Display chat messages
 for message in st.session_state.chat_messages:
     with st.chat_message(message["role"]):
         st.write(message["content"])
         
-        # If it's an assistant message with JSON, try to display it nicely
-        if message["role"] == "assistant" and message["content"].strip().startswith("{") and message["content"].strip().endswith("}"):
-            try:
-                script_json = json.loads(message["content"])
-                if "scenes" in script_json:
-                    st.subheader("Script Preview")
-                    for scene in script_json["scenes"]:
-                        with st.expander(f"Scene {scene.get('scene_number', '')}"):
-                            st.write(f"**Description:** {scene.get('scene_description', '')}")
-                            st.write(f"**Image Prompt:** {scene.get('image_prompt', '')}")
-                            st.write(f"**Video Prompt:** {scene.get('video_prompt', '')}")
-                            st.write(f"**Narration:** {scene.get('narration', '')}")
-            except:
-                pass
+        # If it's an assistant message with JSON, display it nicely; the
+        # parse happened once at insertion time, reruns just read it back
+        if message["role"] == "assistant":
+            script_json = message.get("parsed")
+            if script_json and "scenes" in script_json:
+                st.subheader("Script Preview")
+                for scene in script_json["scenes"]:
+                    with st.expander(f"Scene {scene.get('scene_number', '')}"):
+                        st.write(f"**Description:** {scene.get('scene_description', '')}")
+                        st.write(f"**Image Prompt:** {scene.get('image_prompt', '')}")
+                        st.write(f"**Video Prompt:** {scene.get('video_prompt', '')}")
+                        st.write(f"**Narration:** {scene.get('narration', '')}")
 
 # Chat input
 if prompt := st.chat_input("Ask me about creating a script for your product..."):
@@ -269,30 +341,30 @@ if prompt := st.chat_input("Ask me about creating a script for your product...")
             # Prepare messages for the agent
             messages = [{"role": msg["role"], "content": msg["content"]} for msg in st.session_state.chat_messages]
             
-            # Call the agent
-            result = script_writer_agent.invoke({"messages": messages})
-            response = result.get("output", "I'm having trouble generating a response.")
+            # Call the agent (cached per message list)
+            try:
+                response = _invoke_agent(json.dumps(messages)) or "I'm having trouble generating a response."
+            except FutureTimeoutError:
+                st.error(f"The assistant timed out after {_AGENT_TIMEOUT_SECONDS}s. Please try again.")
+                st.stop()
             
             # Display the response
             st.write(response)
-            
-            # Add assistant response to chat history
-            st.session_state.chat_messages.append({"role": "assistant", "content": response})
-            
-            # Try to parse as JSON for better display
-            if response.strip().startswith("{") and response.strip().endswith("}"):
-                try:
-                    script_json = json.loads(response)
-                    if "scenes" in script_json:
-                        st.subheader("Script Preview")
-                        for scene in script_json["scenes"]:
-                            with st.expander(f"Scene {scene.get('scene_number', '')}"):
-                                st.write(f"**Description:** {scene.get('scene_description', '')}")
-                                st.write(f"**Image Prompt:** {scene.get('image_prompt', '')}")
-                                st.write(f"**Video Prompt:** {scene.get('video_prompt', '')}")
-                                st.write(f"**Narration:** {scene.get('narration', '')}")
-                except:
-                    pass
+
+            # Parse once here and store the result on the message so the
+            # history loop never has to re-parse on later reruns
+            script_json = _maybe_json(response)
+            st.session_state.chat_messages.append(
+                {"role": "assistant", "content": response, "parsed": script_json}
+            )
+            if script_json and "scenes" in script_json:
+                st.subheader("Script Preview")
+                for scene in script_json["scenes"]:
+                    with st.expander(f"Scene {scene.get('scene_number', '')}"):
+                        st.write(f"**Description:** {scene.get('scene_description', '')}")
+                        st.write(f"**Image Prompt:** {scene.get('image_prompt', '')}")
+                        st.write(f"**Video Prompt:** {scene.get('video_prompt', '')}")
+                        st.write(f"**Narration:** {scene.get('narration', '')}")
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Distributed task queue for scraper and mux jobs.
+
+Both the Amazon scraper (rate-limit-bound per source IP) and the FFmpeg mux
+jobs are embarrassingly parallel across products/clips, so they can be fanned
+out across worker machines. Start workers with:
+
+    celery -A tasks worker --loglevel=info
+
+and point CELERY_BROKER_URL at a shared Redis instance.
+"""
+
+import os
+
+from celery import Celery
+
+from add_audio_to_video import add_audio_to_video
+from amazon_product_scrapping import get_amazon_product_details
+
+broker_url = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+
+app = Celery(
+    "video_generator_tasks",
+    broker=broker_url,
+    backend=os.getenv("CELERY_RESULT_BACKEND", broker_url),
+)
+
+
+@app.task
+def scrape_product_task(url: str) -> dict:
+    """Scrape an Amazon product page on any available worker."""
+    return get_amazon_product_details(url)
+
+
+@app.task
+def mux_audio_task(video_path: str, audio_path: str, output_path: str = None) -> dict:
+    """Mux an audio track into a video on any available worker.
+
+    Paths must be on storage shared between the API host and the workers.
+    """
+    return add_audio_to_video(video_path, audio_path, output_path)
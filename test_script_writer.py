@@ -11,6 +11,23 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.agents.script_writer_agent import script_writer_agent
 
+# orjson parses 2-5x faster than the stdlib; fall back quietly if absent
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+def _maybe_json(s):
+    """Parse s as a JSON object, or return None (one strip, one parse)."""
+    s = s.strip()
+    if not s or s[0] != "{" or s[-1] != "}":
+        return None
+    try:
+        return _json_loads(s)
+    except ValueError:
+        return None
+
 def test_script_writer():
     """
     Test the script writer agent with an interactive conversation flow.
@@ -26,17 +43,28 @@ def test_script_writer():
     # Start conversation loop
     while True:
         # Get user input
-        print("You: ", end="")
-        user_input = ""
-        
-        # Support multi-line input for JSON
+        print("You: ", end="", flush=True)
+
+        # Support multi-line input for JSON; collect lines into a list
+        # and join once so pasting a large blob stays linear-time
+        lines = []
+        at_eof = False
         while True:
-            line = input().strip()
-            if not line and user_input:
+            line = sys.stdin.readline()
+            if not line:
+                at_eof = True  # stdin exhausted (piped/scripted input)
+                break
+            line = line.rstrip("\n")
+            if not line.strip() and lines:
                 break  # Empty line after content ends input
-            user_input += line + "\n"
-        
-        user_input = user_input.strip()
+            lines.append(line)
+
+        user_input = "\n".join(lines).strip()
+
+        # End the conversation at EOF instead of looping on empty input
+        if at_eof and not user_input:
+            print("\nEnd of input. Goodbye!")
+            break
         
         # Check for exit command
         if user_input.lower() in ["exit", "quit", "q"]:
@@ -44,13 +72,8 @@ def test_script_writer():
             break
         
         # Try to parse as JSON if it looks like JSON
-        if user_input.startswith("{") and user_input.endswith("}"):
-            try:
-                parsed_json = json.loads(user_input)
-                print("\nDetected JSON input. Extracting product information...\n")
-            except json.JSONDecodeError:
-                # Not valid JSON, that's okay
-                pass
+        if _maybe_json(user_input) is not None:
+            print("\nDetected JSON input. Extracting product information...\n")
         
         # Add user message to session
         session_messages.append({"content": user_input, "role": "user"})
@@ -68,31 +91,28 @@ def test_script_writer():
             # Print AI response
             print(f"\nAgent: {output}\n")
             
-            # Try to parse as JSON if it looks like JSON
-            if output.strip().startswith("{") and output.strip().endswith("}"):
-                try:
-                    script_json = json.loads(output)
-                    print("\n=== Formatted Script ===\n")
-                    
-                    # Print formatted script
-                    if "product_name" in script_json:
-                        print(f"Product: {script_json['product_name']}")
-                    if "video_duration" in script_json:
-                        print(f"Duration: {script_json['video_duration']}")
-                    
-                    # Print scenes
-                    if "scenes" in script_json:
-                        for scene in script_json["scenes"]:
-                            scene_num = scene.get("scene_number", "")
-                            duration = scene.get("duration_seconds", "")
-                            print(f"\nScene {scene_num} - {duration}s")
-                            print(f"Description: {scene.get('scene_description', '')}")
-                            print(f"Image Prompt: {scene.get('image_prompt', '')}")
-                            print(f"Video Prompt: {scene.get('video_prompt', '')}")
-                            print(f"Narration: {scene.get('narration', '')}")
-                except json.JSONDecodeError:
-                    # Not valid JSON, that's okay - it's conversational
-                    pass
+            # Try to parse as JSON if it looks like JSON (None means it
+            # was conversational, which is okay)
+            script_json = _maybe_json(output)
+            if script_json is not None:
+                print("\n=== Formatted Script ===\n")
+
+                # Print formatted script
+                if "product_name" in script_json:
+                    print(f"Product: {script_json['product_name']}")
+                if "video_duration" in script_json:
+                    print(f"Duration: {script_json['video_duration']}")
+
+                # Print scenes
+                if "scenes" in script_json:
+                    for scene in script_json["scenes"]:
+                        scene_num = scene.get("scene_number", "")
+                        duration = scene.get("duration_seconds", "")
+                        print(f"\nScene {scene_num} - {duration}s")
+                        print(f"Description: {scene.get('scene_description', '')}")
+                        print(f"Image Prompt: {scene.get('image_prompt', '')}")
+                        print(f"Video Prompt: {scene.get('video_prompt', '')}")
+                        print(f"Narration: {scene.get('narration', '')}")
         except Exception as e:
             print(f"\nError: {str(e)}")
 
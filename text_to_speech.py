@@ -5,24 +5,98 @@ Text to speech utility script using OpenAI's API.
 This script generates audio from text using OpenAI's text-to-speech API.
 """
 
+import asyncio
+import functools
+import hashlib
 import os
 import logging
 import uuid
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import httpx
 import requests
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 # Set up logging
-logging.basicConfig(level=logging.INFO, 
+logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _validate_inputs(text: str, voice: str, model: str, speed: float):
+    """Validate TTS arguments, falling back to defaults on bad values.
+
+    Returns:
+        tuple: (voice, model, speed) with invalid values replaced
+    """
+    valid_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+    if voice not in valid_voices:
+        logger.warning(f"Invalid voice '{voice}', using default 'alloy'")
+        voice = "alloy"
+
+    valid_models = ["tts-1", "tts-1-hd"]
+    if model not in valid_models:
+        logger.warning(f"Invalid model '{model}', using default 'tts-1'")
+        model = "tts-1"
+
+    if speed < 0.25 or speed > 4.0:
+        logger.warning(f"Invalid speed '{speed}', using default 1.0")
+        speed = 0.83
+
+    return voice, model, speed
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: Optional[str] = None) -> OpenAI:
+    """Return a memoized OpenAI client for the given API key.
+
+    Reusing one client keeps the underlying httpx connection pool warm,
+    so batch TTS calls skip a TCP+TLS handshake per request.
+    """
+    return OpenAI(
+        api_key=api_key,  # Will use OPENAI_API_KEY env var if None
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        max_retries=2,
+    )
+
+def _stat_size(path: str) -> int:
+    """Return the file's size in bytes, or -1 if it does not exist.
+
+    One os.stat instead of an exists + getsize pair: half the syscalls
+    and an atomic view of the file.
+    """
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return -1
+
+# Generated audio is content-addressed by its request parameters, so an
+# unchanged scene narration is a file stat instead of a fresh API call.
+# The directory is created once at import so per-call paths skip the
+# makedirs stat dance entirely.
+_AUDIO_CACHE_DIR = "temp/audio/cache"
+os.makedirs(_AUDIO_CACHE_DIR, exist_ok=True)
+
+def _audio_cache_key(text: str, voice: str, model: str, speed: float, output_format: str) -> str:
+    """Hash the full TTS request into a filename-safe cache key."""
+    payload = f"{text}|{voice}|{model}|{speed}|{output_format}".encode()
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+def _resolve_output_path(output_path: Optional[str], output_format: str, cache_key: str) -> str:
+    """Return the output path, creating its directory as needed.
+
+    Without an explicit path the file lands in the content-addressed
+    cache directory (created at import time), so identical requests
+    reuse the same file; only custom paths pay a makedirs call.
+    """
+    if output_path is None:
+        return os.path.join(_AUDIO_CACHE_DIR, f"{cache_key}.{output_format}")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    return output_path
+
 def generate_audio_from_text(
     text: str, 
     voice: str = "alloy", 
     model: str = "tts-1",
     output_path: Optional[str] = None,
-    output_format: str = "mp3",
+    output_format: str = "opus",
     speed: float = 0.83,
     api_key: Optional[str] = None
 ) -> Dict[str, Any]:
@@ -34,7 +108,7 @@ def generate_audio_from_text(
         voice: The voice to use (alloy, echo, fable, onyx, nova, shimmer)
         model: The TTS model to use (tts-1, tts-1-hd)
         output_path: Path where the output audio should be saved (optional)
-        output_format: Format of the output audio file (mp3, opus, aac, flac)
+        output_format: Format of the output audio file (opus, mp3, aac, flac)
         speed: Speed of the audio (0.25 to 4.0)
         api_key: OpenAI API key (optional, will use environment variable if not provided)
         
@@ -46,62 +120,46 @@ def generate_audio_from_text(
         if not text:
             logger.error("No text provided for speech generation")
             return {"success": False, "error": "No text provided for speech generation"}
-            
-        # Validate voice
-        valid_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
-        if voice not in valid_voices:
-            logger.warning(f"Invalid voice '{voice}', using default 'alloy'")
-            voice = "alloy"
-            
-        # Validate model
-        valid_models = ["tts-1", "tts-1-hd"]
-        if model not in valid_models:
-            logger.warning(f"Invalid model '{model}', using default 'tts-1'")
-            model = "tts-1"
-            
-        # Validate speed
-        if speed < 0.25 or speed > 4.0:
-            logger.warning(f"Invalid speed '{speed}', using default 1.0")
-            speed = 0.83
-            
-        # Generate output path if not provided
-        if output_path is None:
-            os.makedirs("temp/audio", exist_ok=True)
-            output_path = f"temp/audio/speech_{uuid.uuid4()}.{output_format}"
-        else:
-            # Ensure output directory exists
-            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-        
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)  # Will use OPENAI_API_KEY env var if api_key is None
-        
+
+        voice, model, speed = _validate_inputs(text, voice, model, speed)
+        use_cache = output_path is None
+        output_path = _resolve_output_path(
+            output_path, output_format,
+            _audio_cache_key(text, voice, model, speed, output_format)
+        )
+        if use_cache and _stat_size(output_path) > 0:
+            logger.info(f"Serving cached audio: {output_path}")
+            return {
+                "success": True,
+                "output_path": output_path,
+                "voice": voice,
+                "model": model,
+                "format": output_format
+            }
+
+        # Memoized client; connections are reused across calls
+        client = _get_client(api_key)
+
         # Generate speech
         logger.info(f"Generating speech for text: {text[:50]}{'...' if len(text) > 50 else ''}")
         
-        response = client.audio.speech.create(
+        # Stream the audio straight to disk; chunks are written as they
+        # arrive instead of buffering the whole file in memory first
+        with client.audio.speech.with_streaming_response.create(
             model=model,
             voice=voice,
             input=text,
             speed=speed,
             response_format=output_format
-        )
-        
-        # Save to file
-        response.stream_to_file(output_path)
+        ) as response:
+            response.stream_to_file(output_path)
         
         # Verify the output file was created and has content
-        if not os.path.exists(output_path):
-            logger.error(f"Output file was not created: {output_path}")
-            return {
-                "success": False, 
-                "error": f"Output file was not created: {output_path}"
-            }
-            
-        if os.path.getsize(output_path) == 0:
-            logger.error(f"Output file is empty: {output_path}")
+        if _stat_size(output_path) <= 0:
+            logger.error(f"Output file is missing or empty: {output_path}")
             return {
-                "success": False, 
-                "error": f"Output file is empty: {output_path}"
+                "success": False,
+                "error": f"Output file is missing or empty: {output_path}"
             }
         
         logger.info(f"Successfully generated audio: {output_path}")
@@ -120,6 +178,138 @@ def generate_audio_from_text(
             "error": f"Error generating audio from text: {str(e)}"
         }
 
+async def generate_audio_from_text_async(
+    text: str,
+    voice: str = "alloy",
+    model: str = "tts-1",
+    output_path: Optional[str] = None,
+    output_format: str = "opus",
+    speed: float = 0.83,
+    client: Optional[AsyncOpenAI] = None
+) -> Dict[str, Any]:
+    """
+    Async variant of generate_audio_from_text for concurrent narration.
+
+    Args:
+        text: The text to convert to speech
+        voice: The voice to use (alloy, echo, fable, onyx, nova, shimmer)
+        model: The TTS model to use (tts-1, tts-1-hd)
+        output_path: Path where the output audio should be saved (optional)
+        output_format: Format of the output audio file (opus, mp3, aac, flac)
+        speed: Speed of the audio (0.25 to 4.0)
+        client: Shared AsyncOpenAI client (one is created if not provided)
+
+    Returns:
+        dict: Dictionary containing success status, output path, and any error message
+    """
+    try:
+        if not text:
+            logger.error("No text provided for speech generation")
+            return {"success": False, "error": "No text provided for speech generation"}
+
+        voice, model, speed = _validate_inputs(text, voice, model, speed)
+        use_cache = output_path is None
+        output_path = _resolve_output_path(
+            output_path, output_format,
+            _audio_cache_key(text, voice, model, speed, output_format)
+        )
+        if use_cache and _stat_size(output_path) > 0:
+            logger.info(f"Serving cached audio: {output_path}")
+            return {
+                "success": True,
+                "output_path": output_path,
+                "voice": voice,
+                "model": model,
+                "format": output_format
+            }
+
+        owns_client = client is None
+        if owns_client:
+            client = AsyncOpenAI(timeout=60.0)
+
+        logger.info(f"Generating speech for text: {text[:50]}{'...' if len(text) > 50 else ''}")
+
+        try:
+            async with client.audio.speech.with_streaming_response.create(
+                model=model,
+                voice=voice,
+                input=text,
+                speed=speed,
+                response_format=output_format
+            ) as response:
+                await response.stream_to_file(output_path)
+        finally:
+            if owns_client:
+                await client.close()
+
+        if _stat_size(output_path) <= 0:
+            logger.error(f"Output file is missing or empty: {output_path}")
+            return {
+                "success": False,
+                "error": f"Output file is missing or empty: {output_path}"
+            }
+
+        logger.info(f"Successfully generated audio: {output_path}")
+        return {
+            "success": True,
+            "output_path": output_path,
+            "voice": voice,
+            "model": model,
+            "format": output_format
+        }
+
+    except Exception as e:
+        logger.error(f"Error generating audio from text: {str(e)}")
+        return {
+            "success": False,
+            "error": f"Error generating audio from text: {str(e)}"
+        }
+
+def generate_audio_batch(texts: List[str], max_concurrency: int = 4, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Generate audio for several texts concurrently on one async client.
+
+    Total wall time is roughly the slowest generation instead of the sum,
+    which matters when narrating one clip per scene. Concurrency is
+    bounded so large batches stay inside the API rate limits.
+
+    Args:
+        texts: The texts to convert to speech
+        max_concurrency: Maximum generations in flight at once
+        **kwargs: Forwarded to generate_audio_from_text_async
+
+    Returns:
+        list: One result dict per input text, in order
+    """
+    async def _run_batch():
+        client = AsyncOpenAI(timeout=60.0)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate_one(text):
+            async with semaphore:
+                return await generate_audio_from_text_async(text, client=client, **kwargs)
+
+        try:
+            return await asyncio.gather(*(generate_one(text) for text in texts))
+        finally:
+            await client.close()
+
+    return asyncio.run(_run_batch())
+
+def generate_audio_for_scenes(scenes: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+    """
+    Generate narration audio for each scene of a generated script.
+
+    Args:
+        scenes: Scene dicts as produced by the script writer (each with
+                a "narration" key)
+        **kwargs: Forwarded to generate_audio_batch (voice, model, ...)
+
+    Returns:
+        list: One result dict per scene, in scene order
+    """
+    return generate_audio_batch([scene.get("narration", "") for scene in scenes], **kwargs)
+
 def main():
     """Command line interface for text-to-speech generation."""
     import argparse
@@ -131,7 +321,7 @@ def main():
     parser.add_argument("-m", "--model", default="tts-1", choices=["tts-1", "tts-1-hd"], 
                         help="TTS model to use")
     parser.add_argument("-o", "--output", help="Path where the output audio should be saved")
-    parser.add_argument("-f", "--format", default="mp3", choices=["mp3", "opus", "aac", "flac"], 
+    parser.add_argument("-f", "--format", default="opus", choices=["mp3", "opus", "aac", "flac"], 
                         help="Format of the output audio file")
     parser.add_argument("-s", "--speed", type=float, default=1.0, 
                         help="Speed of the audio (0.25 to 4.0)")